@@ -0,0 +1,110 @@
+import numpy as np
+import random
+import time
+from RubiksCube import RubiksCube
+from FastRubiksCube import FastRubiksCube, CubeBatch, MOVES, MOVE_TO_ID
+from CubieCube import CubieCube, cubie_keys
+
+
+def check_backends(num_sequences=500, max_moves=30):
+    """
+    Confronta il backend compatto (FastRubiksCube) con il tensore di RubiksCube:
+    dopo ogni mossa stato OHE, feature Manhattan e is_solved devono coincidere.
+    """
+    print(f"--- Confronto backend su {num_sequences} sequenze casuali ---")
+    errors = 0
+
+    for seq in range(num_sequences):
+        cube = RubiksCube()
+        fast = FastRubiksCube()
+        n_moves = random.randint(1, max_moves)
+
+        for _ in range(n_moves):
+            face, reverse = random.choice(MOVES)
+            cube.rotate_face(face, reverse=reverse)
+            fast.rotate_face(face, reverse=reverse)
+
+            same_state = np.array_equal(cube.get_state(), fast.get_state()) and \
+                cube.get_state().dtype == fast.get_state().dtype
+            same_manhattan = np.array_equal(cube.get_manhattan_features(), fast.get_manhattan_features()) and \
+                cube.get_manhattan_features().dtype == fast.get_manhattan_features().dtype
+            same_solved = bool(cube.is_solved()) == bool(fast.is_solved())
+
+            if not (same_state and same_manhattan and same_solved):
+                errors += 1
+                print(f"[ERRORE] Sequenza #{seq}: divergenza dopo la mossa ({face}, {reverse})")
+                break
+
+        # Andata e ritorno tra i due backend
+        if not np.array_equal(FastRubiksCube.from_cube(cube).state, fast.state) or \
+                not np.array_equal(fast.to_cube().cube, cube.cube):
+            errors += 1
+            print(f"[ERRORE] Sequenza #{seq}: conversione tra backend non coerente")
+
+    if errors == 0:
+        print("[OK] I due backend producono risultati identici.")
+    else:
+        print(f"[ERRORE] {errors} sequenze divergenti!")
+
+    # Featurizer vettoriali: stesso output (byte per byte) dei metodi per singolo cubo
+    print("\n--- Featurizer batch ---")
+    cubes = [RubiksCube() for _ in range(200)]
+    for cube in cubes[1:]:  # il primo resta risolto
+        cube.scramble(random.randint(0, max_moves))
+    batch = CubeBatch.from_cubes(cubes)
+    ohe_ref = np.array([c.get_state() for c in cubes])
+    manhattan_ref = np.array([c.get_manhattan_features() for c in cubes])
+    if batch.get_state().tobytes() == ohe_ref.tobytes() and \
+            batch.get_manhattan_features().tobytes() == manhattan_ref.tobytes():
+        print("[OK] OHE e Manhattan batch identici ai metodi per singolo cubo.")
+    else:
+        print("[ERRORE] I featurizer batch divergono dai metodi per singolo cubo!")
+    solved_ref = np.array([c.is_solved() for c in cubes])
+    if np.array_equal(batch.is_solved(), solved_ref) and solved_ref.any():
+        print("[OK] Maschera is_solved batch coerente con is_solved per singolo cubo.")
+    else:
+        print("[ERRORE] La maschera is_solved batch diverge!")
+
+    # Rappresentazione a cubetti: mosse con le tabelle, ritorno agli sticker e chiavi
+    print("\n--- Cubetti e chiavi ---")
+    cubie_errors = 0
+    exact_keys, states = set(), []
+    for seq in range(num_sequences):
+        fast = FastRubiksCube()
+        cubie = CubieCube()
+        for _ in range(random.randint(0, max_moves)):
+            move = random.choice(MOVES)
+            fast.rotate_face(*move)
+            cubie.apply_move(MOVE_TO_ID[move])
+        if not np.array_equal(cubie.to_fast().state, fast.state) or \
+                cubie.key64() != int(cubie_keys(fast.state)[0]) or \
+                (cubie.key() == 0) != fast.is_solved():
+            cubie_errors += 1
+        exact_keys.add(cubie.key())
+        states.append(fast.state)
+    distinct = len(np.unique(np.array(states), axis=0))
+    if cubie_errors == 0 and len(exact_keys) == distinct == len(set(cubie_keys(np.array(states)).tolist())):
+        print(f"[OK] Cubetti coerenti con gli sticker, {distinct} stati distinti e altrettante chiavi.")
+    else:
+        print(f"[ERRORE] {cubie_errors} sequenze incoerenti o chiavi non univoche!")
+
+    # Throughput mosse + controllo goal, come nel ciclo interno del solver
+    print("\n--- Velocità (mossa + is_solved) ---")
+    n = 20000
+    for name, cube in [("RubiksCube", RubiksCube()), ("FastRubiksCube", FastRubiksCube())]:
+        start_t = time.time()
+        for i in range(n):
+            face, reverse = MOVES[i % len(MOVES)]
+            cube.rotate_face(face, reverse=reverse)
+            cube.is_solved()
+        tempo = time.time() - start_t
+        print(f"{name}: {int(n / tempo)} nodi/sec")
+
+    states = CubeBatch.from_cubes(cubes).states
+    start_t = time.time()
+    cubie_keys(np.repeat(states, 100, axis=0))
+    print(f"cubie_keys: {int(len(states) * 100 / (time.time() - start_t))} chiavi/sec")
+
+
+if __name__ == "__main__":
+    check_backends()
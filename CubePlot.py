@@ -0,0 +1,88 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba
+from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+from RubiksCube import SOLVED_CUBE
+
+# Visualizzazione 3D del cubo. Modulo separato da RubiksCube: matplotlib viene importato
+# solo al primo rendering, solver e worker dei generatori restano legati alla sola NumPy.
+
+# Color mapping del rendering 3D, già convertito in RGBA
+STICKER_RGBA = {code: to_rgba(name) for code, name in
+                {'w': 'white', 'g': 'green', 'r': 'red', 'y': 'yellow', 'b': 'blue', 'o': 'orange'}.items()}
+_render_geometry = None
+
+
+def sticker_rgba(stickers):
+    return np.array([STICKER_RGBA.get(sticker, to_rgba('gray')) for sticker in stickers])
+
+
+def sticker_geometry():
+    """
+    Geometria del rendering 3D, calcolata una sola volta: celle degli sticker (54, 3) e le 6 facce
+    del cubetto unitario di ogni sticker come array (54 * 6, 4, 3) di vertici.
+    Le rotazioni spostano i colori ma non le celle, quindi la geometria vale per ogni stato.
+    """
+    global _render_geometry
+    if _render_geometry is None:
+        cells = np.argwhere(SOLVED_CUBE != '')
+        vertices = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                             [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]])
+        # bottom, top, front, back, right, left
+        faces = np.array([[0, 1, 2, 3], [4, 5, 6, 7], [0, 1, 5, 4], [2, 3, 7, 6], [1, 2, 6, 5], [0, 3, 7, 4]])
+        polygons = cells[:, None, None, :] + vertices[faces][None, :, :, :]
+        _render_geometry = (cells, polygons.reshape(-1, 4, 3).astype(float))
+    return _render_geometry
+
+
+def plot_views(views, return_fig=False, fig=None):
+    """
+    Disegna i tensori in views (uno per subplot) come un unico Poly3DCollection ciascuno.
+    Passando fig (una figura restituita in precedenza) la si aggiorna in place, per le animazioni.
+    """
+    cells, polygons = sticker_geometry()
+
+    # Un colore per poligono (6 facce per sticker)
+    face_colors = [np.repeat(sticker_rgba(view[tuple(cells.T)]), 6, axis=0) for view in views]
+
+    if fig is not None and hasattr(fig, 'cube_collections'):
+        for collection, colors in zip(fig.cube_collections, face_colors):
+            collection.set_facecolor(colors)
+        fig.canvas.draw_idle()
+        return fig
+
+    # Create a new figure with one subplot per view
+    fig = plt.figure(figsize=(10 * len(views), 10))
+    fig.cube_collections = []
+
+    for i, colors in enumerate(face_colors, 1):
+        ax = fig.add_subplot(1, len(views), i, projection='3d')
+
+        ax.view_init(elev=-150, azim=45, vertical_axis='x')
+
+        collection = Poly3DCollection(polygons, facecolors=colors, edgecolor='black', alpha=1)
+        ax.add_collection3d(collection)
+        fig.cube_collections.append(collection)
+
+        # Set axis limits and equal aspect ratio
+        ax.set_xlim(0, 5)
+        ax.set_ylim(0, 5)
+        ax.set_zlim(0, 5)
+        ax.set_box_aspect((1, 1, 1))
+
+        # Remove axis labels and ticks
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.set_zticks([])
+        ax.set_xlabel('')
+        ax.set_ylabel('')
+        ax.set_zlabel('')
+        ax.set_title(f'View {i}')
+
+    plt.tight_layout()
+
+    #return figure instead of rendering it
+    if return_fig:
+        return fig
+
+    plt.show()
@@ -0,0 +1,367 @@
+import numpy as np
+from math import factorial
+from itertools import product
+from FastRubiksCube import STICKER_COORDS, SOLVED_STATE, MOVE_TABLE, NUM_MOVES, FastRubiksCube, mix64
+
+
+def _color_axis():
+    """Asse del tensore su cui giace, nel cubo risolto, la faccia di ogni codice colore."""
+    axis = {}
+    for code, (x, y, z) in zip(SOLVED_STATE, STICKER_COORDS):
+        axis[int(code)] = next(a for a, v in enumerate((x, y, z)) if v in (0, 4))
+    return [axis[code] for code in range(6)]
+
+
+COLOR_AXIS = _color_axis()
+
+
+def _build_cubie_facelets():
+    """
+    Ricava dalla geometria del tensore 5x5x5 gli sticker di ogni cubetto.
+    Angoli: il primo sticker è quello sull'asse 0 (top/bottom), gli altri due in ordine
+    tale che le normali uscenti formino una terna destrorsa (torsioni coerenti tra angoli).
+    Spigoli: il primo sticker è quello sull'asse 0 se presente, altrimenti quello sull'asse 2.
+    """
+    cubies = {}
+    for i, (x, y, z) in enumerate(STICKER_COORDS):
+        cell = tuple(1 if v == 0 else 3 if v == 4 else v for v in (x, y, z))
+        normal = tuple(-1 if v == 0 else 1 if v == 4 else 0 for v in (x, y, z))
+        cubies.setdefault(cell, []).append((i, normal))
+
+    corners, edges = [], []
+    for cell in sorted(cubies):
+        stickers = cubies[cell]
+        axis_of = {i: next(a for a in range(3) if n[a] != 0) for i, n in stickers}
+        if len(stickers) == 3:
+            first = next(i for i, _ in stickers if axis_of[i] == 0)
+            a, b = [(i, n) for i, n in stickers if i != first]
+            n0 = dict(stickers)[first]
+            if np.linalg.det(np.array([n0, a[1], b[1]])) < 0:
+                a, b = b, a
+            corners.append((first, a[0], b[0]))
+        elif len(stickers) == 2:
+            (i, _), (j, _) = stickers
+            ref_axis = 0 if 0 in (axis_of[i], axis_of[j]) else 2
+            edges.append((i, j) if axis_of[i] == ref_axis else (j, i))
+    return np.array(corners, dtype=np.intp), np.array(edges, dtype=np.intp)
+
+
+CORNER_FACELETS, EDGE_FACELETS = _build_cubie_facelets()
+NUM_CORNERS = len(CORNER_FACELETS)
+NUM_EDGES = len(EDGE_FACELETS)
+
+# Un cubetto è identificato dall'insieme dei suoi colori (maschera di bit).
+# Con colori ripetuti la somma arriva a 3 * 32 = 96: quelle celle restano -1 (cubetto inesistente)
+_CORNER_ID = np.full(128, -1, dtype=np.int8)
+_CORNER_ID[(1 << SOLVED_STATE[CORNER_FACELETS].astype(np.int64)).sum(axis=1)] = np.arange(NUM_CORNERS)
+_EDGE_ID = np.full(128, -1, dtype=np.int8)
+_EDGE_ID[(1 << SOLVED_STATE[EDGE_FACELETS].astype(np.int64)).sum(axis=1)] = np.arange(NUM_EDGES)
+_COLOR_AXIS = np.array(COLOR_AXIS, dtype=np.int8)
+
+
+def _cubie_tables():
+    """
+    Cubetto e orientamento per ogni terna (angoli) o coppia (spigoli) di codici colore, indicizzati da
+    (c0 * 6 + c1) * 6 + c2 e c0 * 6 + c1: cubies_from_stickers si riduce a due gather per tipo di pezzo.
+    Orientamento degli angoli: posizione del colore top/bottom; degli spigoli: il colore di riferimento
+    è quello con l'asse "più forte" (0 prima di 2, 2 prima di 1).
+    """
+    corner_colors = np.array(list(product(range(6), repeat=3)), dtype=np.int64)
+    corner_perm = _CORNER_ID[(1 << corner_colors).sum(axis=1)]
+    corner_ori = np.argmax(_COLOR_AXIS[corner_colors] == 0, axis=1).astype(np.int8)
+
+    edge_colors = np.array(list(product(range(6), repeat=2)), dtype=np.int64)
+    edge_perm = _EDGE_ID[(1 << edge_colors).sum(axis=1)]
+    rank = np.array([0, 2, 1], dtype=np.int8)[_COLOR_AXIS[edge_colors]]
+    edge_ori = (rank[:, 0] > rank[:, 1]).astype(np.int8)
+    return corner_perm, corner_ori, edge_perm, edge_ori
+
+
+_CORNER_PERM_LUT, _CORNER_ORI_LUT, _EDGE_PERM_LUT, _EDGE_ORI_LUT = _cubie_tables()
+
+
+def cubies_from_stickers(states):
+    """
+    Converte una matrice (N, 54) di sticker in (corner_perm, corner_ori, edge_perm, edge_ori):
+    perm[p] = cubetto nella posizione p, ori[p] = sua torsione (mod 3) o flip (mod 2).
+    Solleva ValueError se un angolo o uno spigolo ha una combinazione di colori che non esiste.
+    """
+    states = np.atleast_2d(states).astype(np.intp)
+
+    corner_colors = states[:, CORNER_FACELETS]
+    corner_codes = (corner_colors[:, :, 0] * 6 + corner_colors[:, :, 1]) * 6 + corner_colors[:, :, 2]
+    corner_perm, corner_ori = _CORNER_PERM_LUT[corner_codes], _CORNER_ORI_LUT[corner_codes]
+
+    edge_colors = states[:, EDGE_FACELETS]
+    edge_codes = edge_colors[:, :, 0] * 6 + edge_colors[:, :, 1]
+    edge_perm, edge_ori = _EDGE_PERM_LUT[edge_codes], _EDGE_ORI_LUT[edge_codes]
+
+    if (corner_perm < 0).any() or (edge_perm < 0).any():
+        bad_corners = int((corner_perm < 0).any(axis=0).sum())
+        bad_edges = int((edge_perm < 0).any(axis=0).sum())
+        raise ValueError(f"Colori impossibili su {bad_corners} angoli e {bad_edges} spigoli: "
+                         f"nessun cubetto ha quella combinazione di colori")
+
+    return corner_perm, corner_ori, edge_perm, edge_ori
+
+
+def _permutation_parity(perm):
+    return sum(int(a > b) for i, a in enumerate(perm) for b in perm[i + 1:]) % 2
+
+
+def validate_state(state):
+    """
+    Controlla che 54 sticker descrivano un cubo risolvibile: combinazioni di colori esistenti,
+    ogni cubetto presente una volta, somma delle torsioni degli angoli multipla di 3,
+    dei flip degli spigoli pari, stessa parità delle permutazioni di angoli e spigoli.
+    Solleva ValueError con il motivo; da chiamare prima di avviare una ricerca su uno stato esterno.
+    """
+    corner_perm, corner_ori, edge_perm, edge_ori = (a[0] for a in cubies_from_stickers(state))
+    if len(set(corner_perm.tolist())) != NUM_CORNERS:
+        raise ValueError("Uno stesso angolo compare più volte")
+    if len(set(edge_perm.tolist())) != NUM_EDGES:
+        raise ValueError("Uno stesso spigolo compare più volte")
+    if int(corner_ori.sum()) % 3:
+        raise ValueError("Un angolo è ruotato su se stesso")
+    if int(edge_ori.sum()) % 2:
+        raise ValueError("Uno spigolo è capovolto")
+    if _permutation_parity(corner_perm.tolist()) != _permutation_parity(edge_perm.tolist()):
+        raise ValueError("Due cubetti sono scambiati tra loro")
+
+
+def _move_cubies():
+    """Effetto di ogni mossa sui cubetti: posizione sorgente e torsione aggiunta, ricavati dal risolto."""
+    solved_children = SOLVED_STATE[MOVE_TABLE]
+    return cubies_from_stickers(solved_children)
+
+
+MOVE_CP, MOVE_CO, MOVE_EP, MOVE_EO = _move_cubies()
+
+
+def apply_move_cubies(corner_perm, corner_ori, edge_perm, edge_ori, move_id):
+    """Applica una mossa a livello di cubetti (anche su batch N x 8 / N x 12)."""
+    cp, co, ep, eo = MOVE_CP[move_id], MOVE_CO[move_id], MOVE_EP[move_id], MOVE_EO[move_id]
+    return (corner_perm[..., cp], (corner_ori[..., cp] + co) % 3,
+            edge_perm[..., ep], (edge_ori[..., ep] + eo) % 2)
+
+
+# --- Coordinate ---
+
+def permutation_rank(perms):
+    """Rango lessicografico (codice di Lehmer) di un batch di permutazioni (N, n)."""
+    perms = np.atleast_2d(perms).astype(np.int64)
+    n = perms.shape[1]
+    rank = np.zeros(len(perms), dtype=np.int64)
+    for i in range(n - 1):
+        smaller_after = (perms[:, i + 1:] < perms[:, i:i + 1]).sum(axis=1)
+        rank += smaller_after * factorial(n - 1 - i)
+    return rank
+
+
+def permutation_unrank(ranks, n):
+    """Inversa di permutation_rank: (N,) ranghi -> (N, n) permutazioni."""
+    ranks = np.asarray(ranks, dtype=np.int64).copy()
+    available = np.tile(np.arange(n), (len(ranks), 1))
+    perms = np.empty((len(ranks), n), dtype=np.int8)
+    rows = np.arange(len(ranks))
+    for i in range(n):
+        digit = ranks // factorial(n - 1 - i)
+        ranks %= factorial(n - 1 - i)
+        perms[:, i] = available[rows, digit]
+        # Rimuove l'elemento scelto spostando a sinistra i successivi
+        keep = np.arange(n - i)[None, :] != digit[:, None]
+        available = available[:, :n - i][keep].reshape(len(ranks), n - i - 1)
+    return perms
+
+
+def orientation_coord(ori, base):
+    """Torsioni dei primi n-1 cubetti in base `base` (l'ultima è determinata dalle altre)."""
+    ori = np.atleast_2d(ori).astype(np.int64)
+    coord = np.zeros(len(ori), dtype=np.int64)
+    for i in range(ori.shape[1] - 1):
+        coord = coord * base + ori[:, i]
+    return coord
+
+
+def orientation_uncoord(coords, base, n):
+    coords = np.asarray(coords, dtype=np.int64).copy()
+    ori = np.zeros((len(coords), n), dtype=np.int8)
+    for i in range(n - 2, -1, -1):
+        ori[:, i] = coords % base
+        coords //= base
+    ori[:, n - 1] = (-ori[:, :n - 1].sum(axis=1)) % base
+    return ori
+
+
+N_CORNER_PERM = factorial(NUM_CORNERS)        # 40320
+N_CORNER_ORI = 3 ** (NUM_CORNERS - 1)         # 2187
+N_EDGE_ORI = 2 ** (NUM_EDGES - 1)             # 2048
+
+# Metà degli spigoli tracciati da un pattern database: posizioni ordinate di 6 pezzi + flip
+EDGE_GROUP = 6
+N_EDGE6_POS = factorial(NUM_EDGES) // factorial(NUM_EDGES - EDGE_GROUP)   # 665280
+N_EDGE6 = N_EDGE6_POS * 2 ** EDGE_GROUP
+
+
+def partial_permutation_rank(positions, n=NUM_EDGES):
+    """Rango di k posizioni distinte e ordinate scelte tra n: (N, k) -> (N,)."""
+    positions = np.atleast_2d(positions).astype(np.int64)
+    k = positions.shape[1]
+    rank = np.zeros(len(positions), dtype=np.int64)
+    for i in range(k):
+        digit = positions[:, i] - (positions[:, :i] < positions[:, i:i + 1]).sum(axis=1)
+        rank = rank * (n - i) + digit
+    return rank
+
+
+def partial_permutation_unrank(ranks, k=EDGE_GROUP, n=NUM_EDGES):
+    ranks = np.asarray(ranks, dtype=np.int64).copy()
+    digits = np.empty((len(ranks), k), dtype=np.int64)
+    for i in range(k - 1, -1, -1):
+        digits[:, i] = ranks % (n - i)
+        ranks //= (n - i)
+    available = np.tile(np.arange(n), (len(digits), 1))
+    positions = np.empty((len(digits), k), dtype=np.int8)
+    rows = np.arange(len(digits))
+    for i in range(k):
+        positions[:, i] = available[rows, digits[:, i]]
+        keep = np.arange(n - i)[None, :] != digits[:, i:i + 1]
+        available = available[:, :n - i][keep].reshape(len(digits), n - i - 1)
+    return positions
+
+
+def edge6_coord(edge_perm, edge_ori, pieces):
+    """Coordinata (posizioni, flip) dei 6 spigoli `pieces`: posizione_rank * 64 + bit di flip."""
+    edge_perm = np.atleast_2d(edge_perm)
+    edge_ori = np.atleast_2d(edge_ori)
+    # Posizione corrente di ciascun pezzo tracciato
+    positions = np.argsort(edge_perm, axis=1)[:, list(pieces)]
+    flips = np.take_along_axis(edge_ori, positions, axis=1).astype(np.int64)
+    flip_bits = (flips << np.arange(EDGE_GROUP - 1, -1, -1)).sum(axis=1)
+    return partial_permutation_rank(positions) * 2 ** EDGE_GROUP + flip_bits
+
+
+def corner_coord(corner_perm, corner_ori):
+    """Indice dell'angolo nel pattern database: perm_rank * 2187 + ori_coord."""
+    return permutation_rank(corner_perm) * N_CORNER_ORI + orientation_coord(corner_ori, 3)
+
+
+# --- Tabelle di mossa sulle coordinate (generate al primo uso) ---
+
+_coordinate_tables = None
+
+
+def coordinate_tables():
+    """
+    Tabelle di mossa sulle coordinate, con una riga per valore della coordinata e una colonna per mossa:
+    CP (permutazione angoli), CO (torsione angoli), E6_POS (posizioni di 6 spigoli) e
+    E6_FLIP (maschera di flip da applicare ai 6 bit di orientamento).
+    """
+    global _coordinate_tables
+    if _coordinate_tables is not None:
+        return _coordinate_tables
+
+    perms = permutation_unrank(np.arange(N_CORNER_PERM), NUM_CORNERS)
+    cp_table = np.empty((N_CORNER_PERM, NUM_MOVES), dtype=np.uint16)
+    oris = orientation_uncoord(np.arange(N_CORNER_ORI), 3, NUM_CORNERS)
+    co_table = np.empty((N_CORNER_ORI, NUM_MOVES), dtype=np.uint16)
+    for m in range(NUM_MOVES):
+        cp_table[:, m] = permutation_rank(perms[:, MOVE_CP[m]])
+        co_table[:, m] = orientation_coord((oris[:, MOVE_CP[m]] + MOVE_CO[m]) % 3, 3)
+
+    positions = partial_permutation_unrank(np.arange(N_EDGE6_POS))
+    e6_pos_table = np.empty((N_EDGE6_POS, NUM_MOVES), dtype=np.int32)
+    e6_flip_table = np.empty((N_EDGE6_POS, NUM_MOVES), dtype=np.uint8)
+    shifts = np.arange(EDGE_GROUP - 1, -1, -1)
+    for m in range(NUM_MOVES):
+        # Il pezzo in posizione q finisce nella posizione p con MOVE_EP[m][p] == q
+        destination = np.argsort(MOVE_EP[m])[positions]
+        e6_pos_table[:, m] = partial_permutation_rank(destination)
+        e6_flip_table[:, m] = (MOVE_EO[m][destination].astype(np.int64) << shifts).sum(axis=1)
+
+    _coordinate_tables = {'CP': cp_table, 'CO': co_table, 'E6_POS': e6_pos_table, 'E6_FLIP': e6_flip_table}
+    return _coordinate_tables
+
+
+# --- Chiave compatta dello stato ---
+
+# Metà delle permutazioni degli spigoli: la parità è fissata da quella degli angoli
+N_EDGE_PERM_HALF = factorial(NUM_EDGES) // 2                 # 239500800
+N_CORNER_INDEX = N_CORNER_PERM * N_CORNER_ORI               # < 2^27
+N_EDGE_INDEX = N_EDGE_PERM_HALF * N_EDGE_ORI                # < 2^39
+
+
+def cubie_coordinates(corner_perm, corner_ori, edge_perm, edge_ori):
+    """
+    (indice angoli, indice spigoli) di un batch di stati, entrambi int64.
+    Nel ranking lessicografico le permutazioni 2k e 2k+1 differiscono per uno scambio finale,
+    quindi hanno parità opposta: rank // 2 basta perché la parità si ricava dagli angoli.
+    """
+    corners = permutation_rank(corner_perm) * N_CORNER_ORI + orientation_coord(corner_ori, 3)
+    edges = (permutation_rank(edge_perm) // 2) * N_EDGE_ORI + orientation_coord(edge_ori, 2)
+    return corners, edges
+
+
+def cubie_keys(states):
+    """
+    Chiave stabile a 64 bit (uint64) di una matrice (N, 54) di stati, dalle coordinate dei cubetti.
+    Il gruppo del cubo ha ~4.3e19 stati, più di 2^64: la chiave esatta richiede 66 bit
+    (vedi CubieCube.key), qui viene mescolata su 64 bit come state_hash64. Mai 0.
+    """
+    corners, edges = cubie_coordinates(*cubies_from_stickers(states))
+    return mix64(edges.astype(np.uint64) + corners.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15))
+
+
+class CubieCube:
+    """
+    Rappresentazione a cubetti: permutazione e orientamento di 8 angoli e 12 spigoli.
+    Una mossa è un gather su quattro piccoli array con le tabelle MOVE_CP/CO/EP/EO.
+    """
+
+    def __init__(self, corner_perm=None, corner_ori=None, edge_perm=None, edge_ori=None):
+        self.corner_perm = np.arange(NUM_CORNERS, dtype=np.int8) if corner_perm is None else corner_perm
+        self.corner_ori = np.zeros(NUM_CORNERS, dtype=np.int8) if corner_ori is None else corner_ori
+        self.edge_perm = np.arange(NUM_EDGES, dtype=np.int8) if edge_perm is None else edge_perm
+        self.edge_ori = np.zeros(NUM_EDGES, dtype=np.int8) if edge_ori is None else edge_ori
+
+    @classmethod
+    def from_cube(cls, cube):
+        """Converte un RubiksCube, un FastRubiksCube o un CubieCube."""
+        if isinstance(cube, CubieCube):
+            return cube.clone()
+        return cls(*(a[0] for a in cubies_from_stickers(FastRubiksCube.from_cube(cube).state)))
+
+    def clone(self):
+        return CubieCube(self.corner_perm.copy(), self.corner_ori.copy(),
+                         self.edge_perm.copy(), self.edge_ori.copy())
+
+    def to_fast(self):
+        """Ricostruisce gli sticker: il facelet k del cubetto finisce nello slot (k + ori) della posizione."""
+        state = SOLVED_STATE.copy()
+        slots = (np.arange(3)[None, :] + self.corner_ori[:, None]) % 3
+        state[np.take_along_axis(CORNER_FACELETS, slots, axis=1)] = SOLVED_STATE[CORNER_FACELETS[self.corner_perm]]
+        slots = (np.arange(2)[None, :] + self.edge_ori[:, None]) % 2
+        state[np.take_along_axis(EDGE_FACELETS, slots, axis=1)] = SOLVED_STATE[EDGE_FACELETS[self.edge_perm]]
+        return FastRubiksCube(state)
+
+    def apply_move(self, move_id):
+        self.corner_perm, self.corner_ori, self.edge_perm, self.edge_ori = apply_move_cubies(
+            self.corner_perm, self.corner_ori, self.edge_perm, self.edge_ori, move_id)
+
+    def is_solved(self):
+        return self.key() == 0
+
+    def coordinates(self):
+        """(indice angoli, indice spigoli): insieme identificano lo stato in modo esatto."""
+        corners, edges = cubie_coordinates(self.corner_perm, self.corner_ori, self.edge_perm, self.edge_ori)
+        return int(corners[0]), int(edges[0])
+
+    def key(self):
+        """Chiave esatta (intero Python a 66 bit); 0 solo per il cubo risolto."""
+        corners, edges = self.coordinates()
+        return corners * N_EDGE_INDEX + edges
+
+    def key64(self):
+        """Chiave stabile a 64 bit, uguale a cubie_keys sullo stato a sticker."""
+        corners, edges = cubie_coordinates(self.corner_perm, self.corner_ori, self.edge_perm, self.edge_ori)
+        return int(mix64(edges.astype(np.uint64) + corners.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15))[0])
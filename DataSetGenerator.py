@@ -2,6 +2,12 @@ import numpy as np
 import multiprocessing as mp
 import time
 from RubiksCube import RubiksCube
+from FastRubiksCube import CANONICAL_NEXT, CANONICAL_START
+from CubieCube import cubie_keys
+
+
+# Campioni per blocco nel calcolo delle chiavi dei cubetti
+KEY_BLOCK = 1 << 16
 
 
 class DataSetGenerator:
@@ -17,6 +23,7 @@ class DataSetGenerator:
     def _generate_chunk(self, num_samples_chunk):
         """
         Funzione interna per la generazione di un singolo blocco di dati.
+        Restituisce anche la chiave dei cubetti di ogni campione, usata per la deduplicazione.
         """
         # X: 324 colonne per One-Hot Encoding degli sticker
         # Y: Distanza (numero di mosse)
@@ -31,32 +38,42 @@ class DataSetGenerator:
 
             sequence = []
 
-            last_move_info = (None, None)
+            canonical_state = CANONICAL_START
 
             while len(sequence) < n_scrambles:
                 move = np.random.choice(self.move_list)
                 is_reverse = np.random.choice([True, False])
 
-                # Se la mossa attuale è uguale alla precedente ma con reverse opposto
-                # (es: R seguito da R'), allora la scartiamo e riproviamo.
-                if last_move_info[0] == move and last_move_info[1] != is_reverse:
+                # Encode mossa: 0-5 normali, 6-11 reverse
+                m_id = self.move_to_id[move] + (6 if is_reverse else 0)
+
+                # Scartiamo le mosse che rendono la sequenza ridondante (es: R seguito da R',
+                # tre quarti di giro sulla stessa faccia, U D invece di D U) e riproviamo.
+                next_state = CANONICAL_NEXT[canonical_state, m_id]
+                if next_state < 0:
                     continue
+                canonical_state = next_state
 
                 cube.rotate_face(move, reverse=is_reverse)
-
-                # Encode mossa: 0-5 normali, 6-11 reverse
-                m_id = self.move_to_id[move] + (6 if is_reverse else 0)
                 sequence.append(m_id)
 
             X[i] = cube.get_state()
             y[i] = n_scrambles
             S[i, :n_scrambles] = sequence
 
-        return X, y, S
+        # Chiavi calcolate nel worker e a blocchi (codici colore uint8 ricavati dall'OHE):
+        # il processo principale deduplica sulle sole chiavi, senza riconvertire tutto il dataset
+        keys = np.concatenate([
+            cubie_keys(X[start:start + KEY_BLOCK].reshape(-1, 54, 6).argmax(axis=2).astype(np.uint8))
+            for start in range(0, num_samples_chunk, KEY_BLOCK)
+        ])
+
+        return X, y, S, keys
 
-    def generate(self, filename='rubiks_dataset_2M.npz'):
+    def generate(self, filename='rubiks_dataset_2M.npz', deduplicate=True):
         """
         Esegue la generazione in parallelo e salva il file.
+        Con deduplicate=True gli stati ripetuti vengono salvati una sola volta, con l'etichetta minore.
         """
         samples_per_worker = self.total_samples // self.num_workers
         print(f"[*] Avvio generazione di {self.total_samples} campioni...")
@@ -73,6 +90,16 @@ class DataSetGenerator:
         X_final = np.vstack([r[0] for r in results])
         y_final = np.concatenate([r[1] for r in results])
         S_final = np.vstack([r[2] for r in results])
+        keys = np.concatenate([r[3] for r in results])
+        del results
+
+        if deduplicate:
+            # A parità di chiave viene prima il campione con meno mosse
+            order = np.lexsort((y_final, keys))
+            _, first = np.unique(keys[order], return_index=True)
+            keep = np.sort(order[first])
+            print(f"[*] Rimossi {len(y_final) - len(keep)} stati duplicati.")
+            X_final, y_final, S_final = X_final[keep], y_final[keep], S_final[keep]
 
         print(f"[*] Salvataggio in corso in '{filename}'...")
         np.savez_compressed(filename, X=X_final, y=y_final, moves=S_final)
@@ -0,0 +1,106 @@
+import numpy as np
+import time
+from FastRubiksCube import (FastRubiksCube, CubeBatch, SOLVED_STATE, INVERSE_MOVE, MOVES,
+                            state_hash64)
+
+
+class EndgameTable:
+    """
+    Tabella di finale: tutti gli stati entro `depth` mosse dal cubo risolto, con la distanza esatta
+    e la mossa da applicare per avvicinarsi al risolto. Generata una volta con una BFS all'indietro
+    e salvata come array ordinati per hash (state_hash64), caricabili con memory-map.
+    """
+
+    def __init__(self, keys, distances, next_moves):
+        self.keys = keys
+        self.distances = distances
+        self.next_moves = next_moves
+        self.depth = int(distances.max()) if len(distances) else 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, depth=5, chunk_size=200000):
+        """BFS dal risolto (12 mosse, quarter-turn metric), con deduplicazione per hash."""
+        print(f"[*] Generazione tabella di finale fino a {depth} mosse...")
+        start_time = time.time()
+
+        frontier = SOLVED_STATE[None, :]
+        keys = [state_hash64(frontier)]
+        distances = [np.zeros(1, dtype=np.uint8)]
+        next_moves = [np.full(1, -1, dtype=np.int8)]
+        seen = keys[0]
+
+        for d in range(1, depth + 1):
+            level_states, level_keys, level_moves = [], [], []
+            for i in range(0, len(frontier), chunk_size):
+                children, _, move_ids = CubeBatch(frontier[i:i + chunk_size]).expand_all()
+                child_keys = state_hash64(children)
+                child_keys, first = np.unique(child_keys, return_index=True)
+                new = ~np.isin(child_keys, seen)
+                level_states.append(children[first[new]])
+                level_keys.append(child_keys[new])
+                # Dal figlio si torna al padre (distanza d - 1) con la mossa inversa
+                level_moves.append(np.array(INVERSE_MOVE, dtype=np.int8)[move_ids[first[new]]])
+
+            level_keys = np.concatenate(level_keys)
+            level_keys, first = np.unique(level_keys, return_index=True)
+            frontier = np.concatenate(level_states)[first]
+
+            keys.append(level_keys)
+            distances.append(np.full(len(level_keys), d, dtype=np.uint8))
+            next_moves.append(np.concatenate(level_moves)[first])
+            seen = np.union1d(seen, level_keys)
+            print(f"    - Distanza {d}: {len(level_keys)} stati")
+
+        keys = np.concatenate(keys)
+        order = np.argsort(keys)
+        table = cls(keys[order], np.concatenate(distances)[order], np.concatenate(next_moves)[order])
+        print(f"[+] Tabella generata: {len(table)} stati in {time.time() - start_time:.1f}s")
+        return table
+
+    def save(self, prefix='endgame_table'):
+        np.save(f"{prefix}_keys.npy", self.keys)
+        np.save(f"{prefix}_dist.npy", self.distances)
+        np.save(f"{prefix}_moves.npy", self.next_moves)
+
+    @classmethod
+    def load(cls, prefix='endgame_table'):
+        """Carica la tabella in memory-map: le pagine vengono lette dal disco solo se servono."""
+        return cls(np.load(f"{prefix}_keys.npy", mmap_mode='r'),
+                   np.load(f"{prefix}_dist.npy", mmap_mode='r'),
+                   np.load(f"{prefix}_moves.npy", mmap_mode='r'))
+
+    def lookup(self, states):
+        """
+        Lookup vettoriale di una matrice (N, 54) di stati.
+        Restituisce (distanza esatta, -1 se lo stato non è in tabella; indice nella tabella).
+        """
+        hashes = state_hash64(states)
+        idx = np.searchsorted(self.keys, hashes)
+        idx[idx == len(self.keys)] = 0
+        hit = self.keys[idx] == hashes
+        distances = np.where(hit, self.distances[idx].astype(np.int16), -1)
+        return distances, idx
+
+    def complete(self, cube):
+        """
+        Completa la soluzione da uno stato in tabella seguendo le mosse salvate.
+        Restituisce la lista di mosse (face, reverse) o None se lo stato non è coperto.
+        """
+        cube = FastRubiksCube.from_cube(cube)
+        path = []
+        while not cube.is_solved():
+            distances, idx = self.lookup(cube.state[None, :])
+            if distances[0] < 0 or len(path) > self.depth:
+                return None
+            move_id = int(self.next_moves[idx[0]])
+            cube.apply_move(move_id)
+            path.append(MOVES[move_id])
+        return path
+
+
+if __name__ == "__main__":
+    table = EndgameTable.build(depth=6)
+    table.save('endgame_table')
@@ -0,0 +1,301 @@
+import numpy as np
+import random
+
+
+# Ordine delle facce e dei colori identico a quello usato da RubiksCube.get_state
+FACES = ['top', 'bottom', 'front', 'back', 'left', 'right']
+COLORS = ['w', 'y', 'g', 'b', 'r', 'o']
+COLOR_TO_CODE = {c: i for i, c in enumerate(COLORS)}
+
+# Encode mossa (come in DataSetGenerator): 0-5 normali, 6-11 reverse
+MOVES = [(face, False) for face in FACES] + [(face, True) for face in FACES]
+MOVE_TO_ID = {move: i for i, move in enumerate(MOVES)}
+NUM_MOVES = len(MOVES)
+# Mossa inversa: stessa faccia, verso opposto
+INVERSE_MOVE = [(i + 6) % NUM_MOVES for i in range(NUM_MOVES)]
+
+
+def _build_canonical_table():
+    """
+    Automa delle sequenze canoniche: CANONICAL_NEXT[s, m] è lo stato successivo
+    dopo la mossa m, oppure -1 se m rende la sequenza ridondante.
+    Stati: 0 = nessuna mossa, 1 + m = ultima mossa m (un quarto di giro),
+    1 + NUM_MOVES + f = due quarti di giro in avanti consecutivi sulla faccia f.
+    Vengono scartate: la mossa inversa, X' X' (equivale a X X), il terzo quarto di giro
+    sulla stessa faccia e l'ordine decrescente di due facce opposte (commutano).
+    """
+    num_faces = len(FACES)
+    table = np.full((1 + NUM_MOVES + num_faces, NUM_MOVES), -1, dtype=np.int8)
+    for s in range(len(table)):
+        for m in range(NUM_MOVES):
+            face, reverse = m % num_faces, m >= num_faces
+            if s == 0:
+                table[s, m] = 1 + m
+                continue
+            last_move = s - 1 if s <= NUM_MOVES else None
+            last_face = last_move % num_faces if last_move is not None else s - 1 - NUM_MOVES
+            if face == last_face:
+                if m == last_move and not reverse:
+                    table[s, m] = 1 + NUM_MOVES + face
+                continue
+            # Facce opposte (stesso asse) differiscono nel bit 0: si accetta solo l'ordine crescente
+            if face ^ 1 == last_face and face < last_face:
+                continue
+            table[s, m] = 1 + m
+    return table
+
+
+CANONICAL_NEXT = _build_canonical_table()
+CANONICAL_START = 0
+
+
+def _sticker_coords():
+    """Coordinate nel tensore 5x5x5 dei 54 sticker, nell'ordine di get_state."""
+    coords = []
+    for r in range(3):
+        for c in range(3):
+            coords.append((0, 1 + r, 1 + c))  # Top
+    for r in range(3):
+        for c in range(3):
+            coords.append((4, 1 + r, 1 + c))  # Bottom
+    for r in range(3):
+        for c in range(3):
+            coords.append((1 + r, 0, 1 + c))  # Front
+    for r in range(3):
+        for c in range(3):
+            coords.append((1 + r, 4, 1 + c))  # Back
+    for r in range(3):
+        for c in range(3):
+            coords.append((1 + r, 1 + c, 0))  # Left
+    for r in range(3):
+        for c in range(3):
+            coords.append((1 + r, 1 + c, 4))  # Right
+    return coords
+
+
+STICKER_COORDS = _sticker_coords()
+# Tupla di indici per estrarre/scrivere i 54 sticker dal tensore in un colpo solo
+STICKER_INDEX = tuple(np.array(STICKER_COORDS).T)
+
+
+def _build_move_tables():
+    """
+    Precalcola, per ognuna delle 12 mosse, la permutazione dei 54 sticker.
+    Applica la stessa rotazione di RubiksCube.rotate_face a un tensore di indici:
+    dopo la mossa, lo sticker in posizione i proviene dalla posizione table[m, i].
+    """
+    rot_map = {
+        'top': (slice(0, 2), slice(0, 5), slice(0, 5)),
+        'left': (slice(0, 5), slice(0, 2), slice(0, 5)),
+        'front': (slice(0, 5), slice(0, 5), slice(0, 2)),
+        'bottom': (slice(3, 5), slice(0, 5), slice(0, 5)),
+        'right': (slice(0, 5), slice(3, 5), slice(0, 5)),
+        'back': (slice(0, 5), slice(0, 5), slice(3, 5))
+    }
+
+    ids = np.full((5, 5, 5), -1, dtype=np.int16)
+    ids[STICKER_INDEX] = np.arange(54)
+
+    tables = np.empty((NUM_MOVES, 54), dtype=np.intp)
+    for move_id, (face, reverse) in enumerate(MOVES):
+        tensor = ids.copy()
+        rotating_slice = tensor[rot_map[face]]
+        axis_of_rotation = np.argmin(rotating_slice.shape)
+        axes_of_non_rotation = tuple(a for a in range(3) if a != axis_of_rotation)
+        direction = 1 if reverse else -1
+        tensor[rot_map[face]] = np.rot90(rotating_slice, k=direction, axes=axes_of_non_rotation)
+        tables[move_id] = tensor[STICKER_INDEX]
+    return tables
+
+
+MOVE_TABLE = _build_move_tables()
+
+# Stato risolto: ogni faccia ha il colore con lo stesso indice (w=Top, y=Bottom, ...)
+SOLVED_STATE = np.repeat(np.arange(6, dtype=np.uint8), 9)
+# Firma dello stato risolto: il controllo del goal è un confronto tra 54 byte
+SOLVED_SIGNATURE = SOLVED_STATE.tobytes()
+
+
+def batch_ohe(states, dtype=int):
+    """
+    One-Hot Encoding di una matrice (N, 54) di codici colore -> (N, 324).
+    Con il dtype di default è identico byte per byte a RubiksCube.get_state.
+    """
+    states = np.asarray(states)
+    ohe_matrix = states[:, :, None] == np.arange(6, dtype=states.dtype)
+    return ohe_matrix.reshape(len(states), 324).astype(dtype)
+
+
+def batch_manhattan(states):
+    """
+    Feature Manhattan (N, 54) uint8 come in RubiksCube.get_manhattan_features:
+    0 sulla faccia giusta, 2 sulla faccia opposta, 1 altrimenti.
+    """
+    # La faccia target di un colore coincide con il suo codice; le opposte differiscono nel bit 0
+    states = np.asarray(states)
+    distances = (states != SOLVED_STATE).astype(np.uint8)
+    distances[(states ^ 1) == SOLVED_STATE] = 2
+    return distances
+
+
+def _splitmix64_sequence(seed, n):
+    """Sequenza deterministica di interi a 64 bit (splitmix64), indipendente da versione e processo."""
+    values = []
+    for _ in range(n):
+        seed = (seed + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+        z = seed
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        values.append(z ^ (z >> 31))
+    return values
+
+
+_HASH_WEIGHTS = np.array(_splitmix64_sequence(0x4D61676963, 54), dtype=np.uint64)
+
+
+def state_hash64(states):
+    """
+    Hash stabile a 64 bit di una matrice (N, 54) di stati (o di un singolo stato).
+    A differenza di hash() non dipende dal processo: si può salvare su disco.
+    Lo 0 non viene mai prodotto (è riservato agli slot vuoti delle tabelle hash).
+    """
+    states = np.atleast_2d(states)
+    return mix64((states.astype(np.uint64) * _HASH_WEIGHTS).sum(axis=1, dtype=np.uint64))
+
+
+def mix64(h):
+    """Finalizzatore splitmix64 su un array uint64 (distribuisce i bit); 0 viene rimappato su 1."""
+    h = np.array(h, dtype=np.uint64)
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    h[h == 0] = 1
+    return h
+
+
+class FastRubiksCube:
+    """
+    Backend compatto del cubo: i 54 sticker sono un vettore uint8 (codici colore 0-5)
+    e ogni mossa è un singolo gather con una permutazione precalcolata.
+    Espone la stessa API di RubiksCube usata da Solver e dai generatori di dataset.
+    """
+
+    def __init__(self, state=None):
+        if state is None:
+            self.state = SOLVED_STATE.copy()
+        else:
+            self.state = np.array(state, dtype=np.uint8)
+
+    @classmethod
+    def from_cube(cls, cube):
+        """Converte un RubiksCube (tensore 'U10') o un FastRubiksCube nel backend compatto."""
+        if isinstance(cube, FastRubiksCube):
+            return cls(cube.state)
+        stickers = cube.cube[STICKER_INDEX]
+        return cls([COLOR_TO_CODE[s] for s in stickers])
+
+    def clone(self):
+        """Copia veloce: duplica solo il buffer dei 54 sticker."""
+        new = FastRubiksCube.__new__(FastRubiksCube)
+        new.state = self.state.copy()
+        return new
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    def to_cube(self):
+        """Ricostruisce il RubiksCube a tensore equivalente (per GUI e visualizzazione)."""
+        from RubiksCube import RubiksCube
+        cube = RubiksCube()
+        cube.cube[STICKER_INDEX] = np.array(COLORS)[self.state]
+        return cube
+
+    def print_cube(self):
+        print(np.array(COLORS)[self.state].reshape(6, 3, 3))
+
+    def apply_move(self, move_id):
+        """
+        Applica la mossa move_id (indice in MOVES). Non è in place: il gather crea un nuovo vettore
+        di 54 byte e lo assegna a self.state (più rapido di un gather in un buffer preallocato),
+        quindi i riferimenti al vecchio self.state restano sullo stato precedente.
+        """
+        self.state = self.state[MOVE_TABLE[move_id]]
+
+    def undo_move(self, move_id):
+        """Annulla apply_move(move_id) applicando la mossa inversa (stesso nuovo vettore)."""
+        self.state = self.state[MOVE_TABLE[INVERSE_MOVE[move_id]]]
+
+    def rotate_face(self, face, reverse=False):
+        self.apply_move(MOVE_TO_ID[(face, reverse)])
+
+    def visualize_opposite_corners(self, return_fig=False, fig=None):
+        return self.to_cube().visualize_opposite_corners(return_fig=return_fig, fig=fig)
+
+    def get_state(self):
+        return batch_ohe(self.state[None, :])[0]
+
+    def scramble(self, n=20):
+        moves = []
+        for _ in range(n):
+            selected_move = random.choice(MOVES)
+            moves.append(selected_move)
+            self.rotate_face(selected_move[0], reverse=selected_move[1])
+        return moves
+
+    def unscramble(self, moves):
+        for face, reverse in reversed(moves):
+            self.rotate_face(face, reverse=not reverse)
+
+    def get_manhattan_features(self):
+        return batch_manhattan(self.state[None, :])[0]
+
+    def is_solved(self):
+        """Verifica se il cubo è in stato risolto."""
+        return self.state.tobytes() == SOLVED_SIGNATURE
+
+
+class CubeBatch:
+    """
+    Insieme di N cubi come matrice (N, 54) di codici colore uint8.
+    Ogni mossa viene applicata a tutti i cubi con un'unica operazione NumPy.
+    """
+
+    def __init__(self, states):
+        self.states = np.asarray(states, dtype=np.uint8).reshape(-1, 54)
+
+    @classmethod
+    def from_cubes(cls, cubes):
+        return cls(np.array([FastRubiksCube.from_cube(c).state for c in cubes], dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.states)
+
+    def apply_move(self, move_id):
+        """Restituisce la matrice (N, 54) dei figli ottenuti applicando move_id a ogni cubo."""
+        return self.states[:, MOVE_TABLE[move_id]]
+
+    def expand_all(self):
+        """
+        Applica tutte le 12 mosse a ogni cubo.
+        Restituisce (figli (N*12, 54), indice del padre, id della mossa) in ordine padre-major.
+        """
+        n = len(self.states)
+        children = self.states[:, MOVE_TABLE].reshape(n * NUM_MOVES, 54)
+        parent_idx = np.repeat(np.arange(n), NUM_MOVES)
+        move_ids = np.tile(np.arange(NUM_MOVES), n)
+        return children, parent_idx, move_ids
+
+    def get_state(self, dtype=int):
+        return batch_ohe(self.states, dtype=dtype)
+
+    def get_manhattan_features(self):
+        return batch_manhattan(self.states)
+
+    def is_solved(self):
+        """Maschera booleana (N,) dei cubi risolti."""
+        return (self.states == SOLVED_STATE).all(axis=1)
+
+    def cube(self, i):
+        return FastRubiksCube(self.states[i])
@@ -0,0 +1,273 @@
+import os
+import time
+import hashlib
+import numpy as np
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LRUHeuristicCache:
+    """
+    Cache LRU di dimensione limitata per le predizioni del modello.
+    La chiave è lo stato compatto del cubo, il valore la predizione grezza (float).
+    """
+
+    def __init__(self, max_size=500000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Restituisce la predizione salvata o None, aggiornando l'ordine LRU."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, keys):
+        """
+        Lookup di un batch di chiavi.
+        Restituisce (valori float64 con NaN per i miss, maschera booleana dei miss).
+        """
+        values = np.array([self.get(key) for key in keys], dtype=np.float64)
+        return values, np.isnan(values)
+
+    def put_many(self, keys, values):
+        for key, value in zip(keys, values):
+            self.put(key, float(value))
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+_HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'), ('version', '<u4'), ('capacity', '<u8'), ('count', '<u8'), ('fingerprint', '<u8')
+])
+
+
+def model_fingerprint(pipeline, model_path, sample_bytes=1 << 20):
+    """
+    Impronta a 64 bit (mai 0) di pipeline e modello, salvata nell'header della cache su disco.
+    Del file del modello si leggono dimensione, primo e ultimo MB: basta a distinguere due modelli
+    senza rileggere centinaia di MB a ogni avvio.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(pipeline.encode())
+    size = os.path.getsize(model_path)
+    digest.update(size.to_bytes(8, 'little'))
+    with open(model_path, 'rb') as f:
+        digest.update(f.read(sample_bytes))
+        f.seek(max(size - sample_bytes, 0))
+        digest.update(f.read(sample_bytes))
+    return int.from_bytes(digest.digest(), 'little') or 1
+
+
+def _try_lock(fd):
+    """Lock esclusivo non bloccante sul file fd; il sistema lo rilascia anche se il processo muore."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class DiskHeuristicCache:
+    """
+    Cache persistente delle predizioni: tabella hash a indirizzamento aperto (linear probing)
+    di dimensione fissa, in un file mappato in memoria condivisibile tra processi.
+    La chiave è la stessa della cache LRU del solver, cubie_keys dello stato (mai 0, che indica
+    lo slot vuoto), il valore la predizione float32.
+
+    I processi aprono il file in sola lettura e accumulano le nuove predizioni in memoria;
+    merge() le scrive nel file con un solo scrittore alla volta (lock sul file <path>.lock, che resta
+    sul disco: il lock è del sistema operativo e sparisce con il processo che lo tiene).
+    Oltre max_pending predizioni accodate put_many chiama merge da sé, così la memoria resta limitata.
+    A tabella piena (MAX_LOAD) l'avviso viene stampato una volta e le nuove predizioni vengono scartate.
+    L'header contiene l'impronta di pipeline e modello (model_fingerprint): aprendo il file con
+    un'impronta diversa si ottiene un errore invece delle predizioni di un altro modello.
+    """
+
+    MAGIC = b'MSHC'
+    VERSION = 3
+    MAX_PROBES = 64
+    MAX_LOAD = 0.7
+
+    def __init__(self, path, fingerprint=None, max_pending=1 << 18):
+        self.path = path
+        self.max_pending = max_pending
+        header = np.memmap(path, dtype=_HEADER_DTYPE, mode='r', shape=(1,))[0]
+        if header['magic'] != self.MAGIC or header['version'] != self.VERSION:
+            raise ValueError(f"{path} non è una cache euristica valida (versione {self.VERSION})")
+        self.fingerprint = int(header['fingerprint'])
+        if fingerprint is not None and self.fingerprint != fingerprint:
+            raise ValueError(f"{path} è stata riempita con un altro modello o pipeline "
+                             f"(impronta {self.fingerprint:016x}, attesa {fingerprint:016x})")
+
+        self.capacity = int(header['capacity'])
+        self.keys, self.values = self._map_tables('r')
+        self.pending = {}
+        self.full = int(header['count']) >= int(self.capacity * self.MAX_LOAD)
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def create(cls, path, capacity=1 << 24, fingerprint=0, **kwargs):
+        """
+        Crea un file di cache vuoto per il modello con impronta fingerprint; la capacità (slot)
+        viene arrotondata alla potenza di 2 successiva. Con il default (16M slot, 192 MB) entrano
+        circa 11.7M predizioni: alcune risoluzioni difficili (una può accodarne più di 3M).
+        """
+        capacity = 1 << max(int(capacity) - 1, 1).bit_length()
+        size = _HEADER_DTYPE.itemsize + capacity * (8 + 4)
+        with open(path, 'wb') as f:
+            f.truncate(size)
+
+        header = np.memmap(path, dtype=_HEADER_DTYPE, mode='r+', shape=(1,))
+        header[0] = (cls.MAGIC, cls.VERSION, capacity, 0, fingerprint)
+        header.flush()
+        return cls(path, fingerprint, **kwargs)
+
+    def _map_tables(self, mode):
+        offset = _HEADER_DTYPE.itemsize
+        keys = np.memmap(self.path, dtype='<u8', mode=mode, offset=offset, shape=(self.capacity,))
+        values = np.memmap(self.path, dtype='<f4', mode=mode, offset=offset + 8 * self.capacity,
+                           shape=(self.capacity,))
+        return keys, values
+
+    def __len__(self):
+        return int(np.memmap(self.path, dtype=_HEADER_DTYPE, mode='r', shape=(1,))['count'][0])
+
+    def get_many(self, hashes):
+        """
+        Lookup vettoriale di un array di hash uint64.
+        Restituisce (valori float64 con NaN per i miss, maschera booleana dei miss).
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        slot_mask = self.capacity - 1
+        slots = (hashes & np.uint64(slot_mask)).astype(np.intp)
+        values = np.full(len(hashes), np.nan)
+
+        active = np.arange(len(hashes))
+        for _ in range(self.MAX_PROBES):
+            if len(active) == 0:
+                break
+            found_keys = self.keys[slots[active]]
+            hit = found_keys == hashes[active]
+            values[active[hit]] = self.values[slots[active[hit]]]
+            # Si prosegue solo sugli slot occupati da altre chiavi
+            active = active[~hit & (found_keys != 0)]
+            slots[active] = (slots[active] + 1) & slot_mask
+
+        miss_mask = np.isnan(values)
+        self.misses += int(miss_mask.sum())
+        self.hits += len(hashes) - int(miss_mask.sum())
+        return values, miss_mask
+
+    def put_many(self, hashes, values):
+        """
+        Accoda nuove predizioni; finiscono nel file con merge(), chiamato da RubiksSolver.close
+        e da qui stesso quando la coda supera max_pending. A cache piena non si accoda più nulla.
+        """
+        if self.full:
+            return
+        self.pending.update(zip(np.asarray(hashes, dtype=np.uint64).tolist(), np.asarray(values).tolist()))
+        if len(self.pending) >= self.max_pending:
+            self.merge()
+
+    def merge(self, lock_timeout=30.0):
+        """
+        Scrive le predizioni accodate nel file. Un solo scrittore alla volta (file di lock);
+        i lettori concorrenti restano validi perché il valore viene scritto prima della chiave.
+        Restituisce il numero di nuove chiavi inserite.
+        """
+        if not self.pending:
+            return 0
+
+        lock_path = self.path + '.lock'
+        lock_fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+        deadline = time.time() + lock_timeout
+        while True:
+            try:
+                _try_lock(lock_fd)
+                break
+            except OSError:
+                if time.time() > deadline:
+                    os.close(lock_fd)
+                    raise TimeoutError(f"Lock di scrittura occupato: {lock_path}")
+                time.sleep(0.05)
+
+        try:
+            header = np.memmap(self.path, dtype=_HEADER_DTYPE, mode='r+', shape=(1,))
+            keys, values = self._map_tables('r+')
+            count = int(header['count'][0])
+            max_count = int(self.capacity * self.MAX_LOAD)
+            slot_mask = self.capacity - 1
+            inserted = 0
+
+            for key, value in self.pending.items():
+                if count >= max_count:
+                    break
+                slot = key & slot_mask
+                for _ in range(self.MAX_PROBES):
+                    current = int(keys[slot])
+                    if current == key:
+                        break
+                    if current == 0:
+                        values[slot] = value
+                        keys[slot] = key
+                        count += 1
+                        inserted += 1
+                        break
+                    slot = (slot + 1) & slot_mask
+
+            values.flush()
+            keys.flush()
+            header['count'][0] = count
+            header.flush()
+            if count >= max_count and not self.full:
+                # Un solo avviso: da qui in poi le nuove predizioni vengono scartate senza messaggi
+                print(f"[-] Cache su disco piena ({count} chiavi): le nuove predizioni non verranno salvate.")
+                self.full = True
+        finally:
+            _unlock(lock_fd)
+            os.close(lock_fd)
+
+        self.pending.clear()
+        return inserted
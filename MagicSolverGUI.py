@@ -1,10 +1,16 @@
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, ttk
 import os
+import time
+import queue
 import datetime
-from PIL import Image, ImageDraw, ImageFont  # Import necessari per il rendering in memoria
+import threading
+import numpy as np
 from RubiksCube import RubiksCube
-from Solver import RubiksSolver
+from SolverClient import get_solver
+from SnapshotWriter import SnapshotWriter, EXPORT_FORMATS, face_views
+from FastRubiksCube import FastRubiksCube
+from CubieCube import validate_state
 
 
 class RubiksAI:
@@ -12,13 +18,13 @@ class RubiksAI:
         # Inizializzazione interfaccia grafica
         self.root = root
         self.root.title("MagicSolver")
-        self.root.geometry("850x800")
+        self.root.geometry("850x860")
         self.root.configure(bg="#2c3e50")
 
-        # Inizializzazione del cubo logico e caricamento del modello (OHE)
+        # Inizializzazione del cubo logico e del solver (servizio locale se attivo, altrimenti modello OHE)
         self.init_cube_data()
         try:
-            self.ai_solver = RubiksSolver(pipeline='OHE')
+            self.ai_solver = get_solver(pipeline='OHE')
         except Exception as e:
             print(f"Avviso: Modello IA non trovato. Esegui prima il training! {e}")
             self.ai_solver = None
@@ -27,6 +33,19 @@ class RubiksAI:
         self.solution_moves = []
         self.snapshot_count = 0
         self.base_output_dir = "cubo_snapshots"
+        # Snapshot in background: 'png' = un file per mossa, altrimenti un unico file gif/apng/sprite
+        self.snapshot_writer = None
+        # Writer chiusi che stanno ancora completando la loro coda (attesi da on_close)
+        self.closing_writers = []
+        self.export_format = tk.StringVar(value=EXPORT_FORMATS[0])
+        # Riproduzione: 800ms per mossa, 50ms in avanti veloce
+        self.fast_forward = tk.BooleanVar(value=False)
+
+        # Ricerca in background: thread di lavoro, coda dei record di avanzamento e richiesta di annullamento
+        self.solve_thread = None
+        self.solve_queue = None
+        self.solve_cancel = None
+        self.solve_start_state = None
 
         self.color_map_logic_to_gui = {
             'w': 'white', 'y': 'yellow', 'g': 'green',
@@ -35,6 +54,7 @@ class RubiksAI:
         self.color_map_gui_to_logic = {v: k for k, v in self.color_map_logic_to_gui.items() if k != ''}
 
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def init_cube_data(self):
         """Inizializza l'oggetto logico RubiksCube."""
@@ -52,6 +72,7 @@ class RubiksAI:
         # --- CENTER: CANVAS ---
         self.canvas = tk.Canvas(self.root, width=650, height=480, bg="#ecf0f1", highlightthickness=0)
         self.canvas.pack(pady=5)
+        self.create_canvas_items()
 
         # --- MIDDLE: MOSSE MANUALI ---
         manual_frame = tk.LabelFrame(self.root, text=" 2. Rotazioni Facce ", bg="#34495e", fg="white", padx=10, pady=5)
@@ -73,25 +94,44 @@ class RubiksAI:
         btn_style = {"font": ("Arial", 10, "bold"), "padx": 15, "pady": 8}
         tk.Button(bot_frame, text="MESCOLA", bg="#f1c40f", **btn_style, command=self.scramble_cube).pack(side=tk.LEFT,
                                                                                                          padx=5)
-        tk.Button(bot_frame, text="VERIFICA", bg="#3498db", fg="white", **btn_style, command=self.solve_with_ai).pack(
-            side=tk.LEFT, padx=5)
+        self.verify_btn = tk.Button(bot_frame, text="VERIFICA", bg="#3498db", fg="white", **btn_style,
+                                    command=self.solve_with_ai)
+        self.verify_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = tk.Button(bot_frame, text="ANNULLA", bg="#95a5a6", fg="white", state=tk.DISABLED,
+                                    **btn_style, command=self.cancel_solve)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
         self.play_btn = tk.Button(bot_frame, text="ESEGUI SOLUZIONE", bg="#2ecc71", fg="white", state=tk.DISABLED,
                                   **btn_style, command=self.start_solving_process)
         self.play_btn.pack(side=tk.LEFT, padx=5)
         tk.Button(bot_frame, text="RESET", bg="#e74c3c", fg="white", **btn_style, command=self.reset_ui).pack(
             side=tk.LEFT, padx=5)
 
+        # --- AVANZAMENTO RICERCA ---
+        progress_frame = tk.Frame(self.root, bg="#2c3e50")
+        progress_frame.pack(pady=5)
+        self.progress = ttk.Progressbar(progress_frame, length=500, mode='determinate', maximum=100)
+        self.progress.pack()
+        self.progress_label = tk.Label(progress_frame, text="", bg="#2c3e50", fg="white", font=("Arial", 10))
+        self.progress_label.pack(pady=3)
+        export_row = tk.Frame(progress_frame, bg="#2c3e50")
+        export_row.pack()
+        tk.Label(export_row, text="Esporta soluzione come:", bg="#2c3e50", fg="white").pack(side=tk.LEFT)
+        tk.OptionMenu(export_row, self.export_format, *EXPORT_FORMATS).pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(export_row, text="Avanti veloce", variable=self.fast_forward, bg="#2c3e50", fg="white",
+                       selectcolor="#34495e", activebackground="#2c3e50").pack(side=tk.LEFT, padx=5)
+
         self.draw_cube()
 
     def set_color(self, color):
         """Seleziona il colore con cui cambiare il cubo."""
         self.selected_color = color
 
-    def draw_cube(self, current_move="Stato Attuale"):
-        """Creazione rappresentazione grafica del cubo."""
-        self.canvas.delete("all")
-        self.canvas.create_text(325, 450, text=f"ULTIMA AZIONE: {current_move}", font=("Arial", 12, "bold"),
-                                fill="#2c3e50")
+    def create_canvas_items(self):
+        """
+        Crea una sola volta testo e 54 rettangoli del canvas, con i relativi click.
+        Gli id restano in self.sticker_items, indicizzati per (faccia, riga, colonna).
+        """
+        self.status_item = self.canvas.create_text(325, 450, text="", font=("Arial", 12, "bold"), fill="#2c3e50")
 
         size = 35
         offsets = {
@@ -102,27 +142,30 @@ class RubiksAI:
             'B': (size * 9 + 20, size * 3 + 40),
             'D': (size * 3 + 19, size * 6 + 40)
         }
-
-        face_data = {
-            'U': self.cube_logic.cube[0, 1:4, 1:4],
-            'D': self.cube_logic.cube[4, 1:4, 1:4],
-            'F': self.cube_logic.cube[1:4, 0, 1:4],
-            'B': self.cube_logic.cube[1:4, 4, 1:4],
-            'L': self.cube_logic.cube[1:4, 1:4, 0],
-            'R': self.cube_logic.cube[1:4, 1:4, 4]
-        }
-
+        self.face_order = list(offsets)
+        self.sticker_items = {}
         for face, (ox, oy) in offsets.items():
-            data = face_data[face]
             for r in range(3):
                 for c in range(3):
-                    logic_color = data[r, c]
-                    gui_color = self.color_map_logic_to_gui.get(logic_color, 'gray')
                     x1, y1 = ox + c * size, oy + r * size
                     rect = self.canvas.create_rectangle(x1, y1, x1 + (size - 2), y1 + (size - 2),
-                                                        fill=gui_color, outline="#2c3e50")
+                                                        fill='gray', outline="#2c3e50")
                     self.canvas.tag_bind(rect, "<Button-1>",
                                          lambda e, f=face, row=r, col=c: self.paint_sticker(f, row, col))
+                    self.sticker_items[(face, r, c)] = rect
+        # Colori attualmente mostrati (6, 3, 3), nell'ordine di face_order
+        self.drawn_colors = np.full((6, 3, 3), '', dtype='U1')
+
+    def draw_cube(self, current_move="Stato Attuale"):
+        """Aggiorna la rappresentazione grafica: itemconfig solo sugli sticker cambiati."""
+        self.canvas.itemconfig(self.status_item, text=f"ULTIMA AZIONE: {current_move}")
+
+        faces = face_views(self.cube_logic.cube)
+        colors = np.array([faces[face] for face in self.face_order])
+        for f, r, c in np.argwhere(colors != self.drawn_colors):
+            gui_color = self.color_map_logic_to_gui.get(colors[f, r, c], 'gray')
+            self.canvas.itemconfig(self.sticker_items[(self.face_order[f], r, c)], fill=gui_color)
+        self.drawn_colors = colors
 
     def paint_sticker(self, face, r, c):
         """Modifica un singolo sticker nel tensore logico."""
@@ -184,10 +227,12 @@ class RubiksAI:
                                      f"Il centro della faccia {name} è errato. I centri non possono cambiare posizione!")
                 return False
 
-        # 3. Controllo spigoli per coppie impossibili
-        opposites = [('w', 'y'), ('g', 'b'), ('r', 'o')]
-        for c1, c2 in opposites:
-            pass
+        # 3. Controllo dei cubetti: combinazioni di colori, torsioni, flip e parità
+        try:
+            validate_state(FastRubiksCube.from_cube(self.cube_logic).state)
+        except ValueError as e:
+            messagebox.showerror("Cubo non valido!", f"{e}. Questa configurazione non si può risolvere.")
+            return False
 
         return True
 
@@ -204,10 +249,100 @@ class RubiksAI:
             messagebox.showinfo("Info", "Il cubo è già risolto!")
             return
 
-        # L'IA prova a risolvere il cubo attuale
-        solution, nodes = self.ai_solver.solve_adaptive_ultra(self.cube_logic)
+        if self.solve_thread is not None:
+            return
 
-        if solution:
+        # L'IA prova a risolvere il cubo attuale in un thread di lavoro, su una copia privata:
+        # la finestra resta reattiva e il cubo mostrato non viene toccato dal solver
+        self.solve_start_state = self.cube_logic.cube.copy()
+        self.solve_cancel = threading.Event()
+        self.solve_queue = queue.Queue()
+        self.solve_thread = threading.Thread(target=self._solve_worker,
+                                             args=(self.cube_logic.clone(), self.solve_cancel, self.solve_queue),
+                                             daemon=True)
+
+        self.verify_btn.config(state=tk.DISABLED)
+        self.play_btn.config(state=tk.DISABLED)
+        self.progress['value'] = 0
+        if self.solve_is_remote():
+            # Il servizio non riceve annullamenti né manda avanzamenti: barra indeterminata, ANNULLA spento
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.progress.config(mode='indeterminate')
+            self.progress.start(50)
+            self.progress_label.config(text="Ricerca sul servizio remoto in corso (non annullabile)...")
+        else:
+            self.cancel_btn.config(state=tk.NORMAL)
+            self.progress_label.config(text="Ricerca in corso...")
+        self.solve_thread.start()
+        self.root.after(100, self._poll_solve)
+
+    def solve_is_remote(self):
+        """True se il solver è il client di SolverService (niente solve_stream, quindi niente annullamento)."""
+        return not hasattr(self.ai_solver, 'solve_stream')
+
+    def _solve_worker(self, cube, cancel_event, results):
+        """Thread di lavoro: inoltra nella coda i record di avanzamento del solver."""
+        try:
+            if hasattr(self.ai_solver, 'solve_stream'):
+                for record in self.ai_solver.solve_stream(cube, cancel_event=cancel_event):
+                    results.put(record)
+            else:
+                # Client del servizio: nessun avanzamento intermedio, solo il risultato finale
+                start_t = time.time()
+                solution, nodes = self.ai_solver.solve_adaptive_ultra(cube)
+                results.put({'done': True, 'path': solution, 'nodes': nodes, 'level': 0, 'depth': 0,
+                             'elapsed': time.time() - start_t, 'cancelled': cancel_event.is_set()})
+        except Exception as e:
+            results.put({'done': True, 'error': repr(e)})
+
+    def _poll_solve(self):
+        """Legge (dal thread della GUI) gli ultimi record del worker e aggiorna la barra di avanzamento."""
+        record = None
+        try:
+            while True:
+                record = self.solve_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+        if record is not None and 'error' not in record:
+            self._show_progress(record)
+        if record is not None and record['done']:
+            self._finish_solve(record)
+        else:
+            self.root.after(100, self._poll_solve)
+
+    def _show_progress(self, record):
+        # Avanzamento stimato: livelli completati più la frazione di profondità del livello corrente
+        levels = self.ai_solver.search_levels() if hasattr(self.ai_solver, 'search_levels') else []
+        if levels and record['level'] > 0:
+            level = levels[record['level'] - 1]
+            max_depth = level.max_depth if level.kind == 'beam' else 1
+            fraction = (record['level'] - 1 + min(record['depth'] / max_depth, 1.0)) / len(levels)
+            self.progress['value'] = 100 * fraction
+        self.progress_label.config(text=f"Livello {record['level']} | Profondità {record['depth']} | "
+                                        f"Nodi {record['nodes']} | {record['elapsed']:.1f}s")
+
+    def _finish_solve(self, record):
+        self.solve_thread = None
+        self.verify_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.DISABLED)
+        if str(self.progress.cget('mode')) == 'indeterminate':
+            self.progress.stop()
+            self.progress.config(mode='determinate')
+            self.progress_label.config(text=f"Ricerca sul servizio remoto: {record.get('elapsed', 0):.1f}s")
+        if record.get('path') is not None:
+            self.progress['value'] = 100
+
+        if 'error' in record:
+            messagebox.showerror("Errore", f"Errore durante la ricerca: {record['error']}")
+        elif record.get('cancelled'):
+            self.progress_label.config(text="Ricerca annullata.")
+        elif not np.array_equal(self.cube_logic.cube, self.solve_start_state):
+            # Il cubo è stato modificato durante la ricerca: la soluzione non vale più
+            messagebox.showwarning("Soluzione scartata",
+                                   "Il cubo è stato modificato durante la ricerca. Premi di nuovo VERIFICA.")
+        elif record['path']:
+            solution, nodes = record['path'], record['nodes']
             self.solution_moves = solution  # Formato: [('top', False), ...]
             # Soluzione trovata quindi il tasto Esegui diventa cliccabile
             self.play_btn.config(state=tk.NORMAL)
@@ -216,6 +351,33 @@ class RubiksAI:
         else:
             messagebox.showerror("IA Fallita", "L'IA non è riuscita a risolvere questa configurazione.")
 
+    def cancel_solve(self):
+        """Chiede al solver di fermarsi: il worker termina alla profondità successiva (solo solver locale)."""
+        if self.solve_cancel is not None and not self.solve_is_remote():
+            self.solve_cancel.set()
+            self.progress_label.config(text="Annullamento in corso...")
+            self.cancel_btn.config(state=tk.DISABLED)
+
+    def close_snapshot_writer(self):
+        """Chiude il writer corrente senza bloccare la GUI: finisce la sua coda in background."""
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.close(wait=False)
+            self.closing_writers = [writer for writer in self.closing_writers if writer.busy()]
+            self.closing_writers.append(self.snapshot_writer)
+            self.snapshot_writer = None
+
+    def on_close(self):
+        self.cancel_solve()
+        self.close_snapshot_writer()
+        self.closing_writers = [writer for writer in self.closing_writers if writer.busy()]
+        if not self.closing_writers:
+            self.root.destroy()
+            return
+        # Esportazioni ancora in corso: la finestra resta aperta (e reattiva) finché non sono complete
+        self.root.protocol("WM_DELETE_WINDOW", lambda: None)
+        self.progress_label.config(text="Salvataggio degli snapshot in corso...")
+        self.root.after(100, self.on_close)
+
     def start_solving_process(self):
         """Crea la cartella dove verranno inseriti gli snapshot della soluzione del cubo."""
         # Crea cartella snapshot
@@ -223,7 +385,17 @@ class RubiksAI:
         self.current_session_dir = os.path.join(self.base_output_dir, f"cubo_session_{timestamp}")
         if not os.path.exists(self.current_session_dir): os.makedirs(self.current_session_dir)
 
+        # Un solo avvio per soluzione: il bottone resta spento per tutta la riproduzione
+        self.play_btn.config(state=tk.DISABLED)
+
         self.snapshot_count = 0
+        # Il writer precedente finisce la sua coda in background, senza bloccare la GUI
+        self.close_snapshot_writer()
+        self.snapshot_writer = SnapshotWriter(self.current_session_dir)
+        if self.export_format.get() != 'png':
+            # Un solo file per tutta la soluzione, generato in background dalla lista di mosse
+            self.snapshot_writer.submit_animation("soluzione", self.cube_logic, self.solution_moves,
+                                                  self.export_format.get())
         self.play_solution(0)
 
     def play_solution(self, index):
@@ -236,59 +408,25 @@ class RubiksAI:
             move_label = f"{move_tuple[0].upper()} {'(REV)' if move_tuple[1] else ''}"
             self.draw_cube(move_label)
 
-            # Creazione snapshot
-            self.take_snapshot(f"step_{index:02d}", move_label, index + 1)
+            # Creazione snapshot (solo nel formato un file per mossa)
+            if self.export_format.get() == 'png':
+                self.take_snapshot(f"step_{index:02d}", move_label, index + 1)
 
-            # Attesa (800ms)
-            self.root.after(800, lambda: self.play_solution(index + 1))
+            # Attesa (800ms, 50ms in avanti veloce)
+            self.root.after(50 if self.fast_forward.get() else 800, lambda: self.play_solution(index + 1))
         else:
             self.draw_cube("RISOLTO!")
-            # Il bottone Esegui viene ri-disabilitato
+            # La soluzione è stata applicata: Esegui resta spento finché VERIFICA non ne trova un'altra
+            self.solution_moves = []
             self.play_btn.config(state=tk.DISABLED)
+            # Il writer termina in background gli snapshot ancora in coda
+            self.close_snapshot_writer()
 
     def take_snapshot(self, filename, move_text, step_num):
-        """ "Fotografa" lo stato attuale del cubo e salva il png nella cartella precedentemente creata."""
-        # Rendering in memoria per evitare immagini nere se la finestra è minimizzata
-        img = Image.new('RGB', (650, 520), "#ecf0f1")
-        draw = ImageDraw.Draw(img)
-
-        # Setup Font
-        try:
-            font_main = ImageFont.truetype("arial.ttf", 22)
-            font_small = ImageFont.truetype("arial.ttf", 14)
-        except:
-            font_main = font_small = None
-
-        draw.text((20, 15), f"STEP #{step_num}: {move_text}", fill="#2c3e50", font=font_main)
-        draw.line((20, 50, 630, 50), fill="#bdc3c7", width=2)
-
-        size = 35
-        offsets = {
-            'U': (size * 3 + 20, 70), 'L': (20, size * 3 + 70), 'F': (size * 3 + 20, size * 3 + 70),
-            'R': (size * 6 + 20, size * 3 + 70), 'B': (size * 9 + 20, size * 3 + 70),
-            'D': (size * 3 + 19, size * 6 + 70)
-        }
-
-        face_data = {
-            'U': self.cube_logic.cube[0, 1:4, 1:4], 'D': self.cube_logic.cube[4, 1:4, 1:4],
-            'F': self.cube_logic.cube[1:4, 0, 1:4], 'B': self.cube_logic.cube[1:4, 4, 1:4],
-            'L': self.cube_logic.cube[1:4, 1:4, 0], 'R': self.cube_logic.cube[1:4, 1:4, 4]
-        }
-
-        for face, (ox, oy) in offsets.items():
-            data = face_data[face]
-            for r in range(3):
-                for c in range(3):
-                    logic_color = data[r, c]
-                    gui_color = self.color_map_logic_to_gui.get(logic_color, 'gray')
-                    x1, y1 = ox + c * size, oy + r * size
-                    x2, y2 = x1 + (size - 2), y1 + (size - 2)
-                    draw.rectangle([x1, y1, x2, y2], fill=gui_color, outline="#2c3e50")
-
-        # Footer
-        draw.text((480, 490), "MagicSolver", fill="#7f8c8d", font=font_small)
-
-        img.save(os.path.join(self.current_session_dir, f"{filename}.png"))
+        """ "Fotografa" lo stato attuale del cubo: il png viene disegnato e salvato dal writer in background."""
+        if self.snapshot_writer is None:
+            return
+        self.snapshot_writer.submit(filename, move_text, step_num, self.cube_logic.cube)
 
     def scramble_cube(self):
         """Mischia il cubo per un numero definito di mosse."""
@@ -0,0 +1,156 @@
+import os
+import queue
+import numpy as np
+import joblib
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+from FastRubiksCube import batch_ohe, batch_manhattan
+
+
+def _attach(buffers, name):
+    """Aggancia (una sola volta) il blocco di memoria condivisa con questo nome."""
+    if name not in buffers:
+        # I blocchi sostituiti da un resize non servono più
+        for old in buffers.values():
+            old.close()
+        buffers.clear()
+        buffers[name] = shared_memory.SharedMemory(name=name)
+    return buffers[name]
+
+
+def _worker_loop(model_path, pipeline, task_queue, result_queue):
+    """
+    Processo worker: carica la propria copia del modello e resta in attesa di intervalli di righe
+    da valutare. Stati in ingresso e predizioni in uscita passano dalla memoria condivisa.
+    """
+    os.environ['OMP_NUM_THREADS'] = '1'
+    model = joblib.load(model_path)
+    if hasattr(model, 'verbose'):
+        model.verbose = 0
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = 1
+
+    in_buffers, out_buffers = {}, {}
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        in_name, out_name, capacity, start, end = task
+        states = out = chunk = X = None
+        try:
+            states = np.ndarray((capacity, 54), dtype=np.uint8, buffer=_attach(in_buffers, in_name).buf)
+            out = np.ndarray((capacity,), dtype=np.float64, buffer=_attach(out_buffers, out_name).buf)
+            chunk = states[start:end]
+            X = batch_ohe(chunk) if pipeline == 'OHE' else batch_manhattan(chunk)
+            out[start:end] = model.predict(X)
+            result_queue.put((start, end, None))
+        except Exception as e:
+            result_queue.put((start, end, repr(e)))
+        # Nessuna vista deve restare agganciata ai buffer: un resize li chiude
+        states = out = chunk = X = None
+
+    for shm in list(in_buffers.values()) + list(out_buffers.values()):
+        shm.close()
+
+
+class ParallelEvaluator:
+    """
+    Valutazione parallela di un livello della beam: le righe della matrice (N, 54) dei figli
+    vengono divise tra un pool persistente di processi, ognuno con il proprio modello precaricato.
+    I figli passano tramite multiprocessing.shared_memory (niente pickling) e le predizioni
+    tornano in un unico array. Il pool resta attivo tra una risoluzione e l'altra fino a close().
+    """
+
+    def __init__(self, model_path, pipeline='OHE', n_workers=None, min_parallel_batch=512, poll_seconds=1.0):
+        self.model_path = model_path
+        self.pipeline = pipeline
+        self.n_workers = n_workers or mp.cpu_count()
+        # Sotto questa soglia il costo di coordinamento supera il guadagno
+        self.min_parallel_batch = min_parallel_batch
+        # Ogni quanto predict controlla che i worker siano ancora vivi mentre attende i risultati
+        self.poll_seconds = poll_seconds
+
+        self.capacity = 0
+        self.in_shm = None
+        self.out_shm = None
+
+        # I worker devono condividere il resource tracker del processo principale,
+        # altrimenti ne avviano uno proprio che distrugge i blocchi condivisi alla loro uscita
+        if os.name == 'posix':
+            resource_tracker.ensure_running()
+
+        self.task_queue = mp.Queue()
+        self.result_queue = mp.Queue()
+        self.workers = [
+            mp.Process(target=_worker_loop, args=(model_path, pipeline, self.task_queue, self.result_queue),
+                       daemon=True)
+            for _ in range(self.n_workers)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def _ensure_capacity(self, n):
+        """Rialloca i buffer condivisi se il livello corrente non ci sta."""
+        if n <= self.capacity:
+            return
+        self._release_buffers()
+        self.capacity = max(n, 2 * self.capacity, 1024)
+        self.in_shm = shared_memory.SharedMemory(create=True, size=self.capacity * 54)
+        self.out_shm = shared_memory.SharedMemory(create=True, size=self.capacity * 8)
+
+    def _release_buffers(self):
+        for shm in (self.in_shm, self.out_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self.in_shm = self.out_shm = None
+
+    def predict(self, states):
+        """Predizioni grezze (N,) per una matrice (N, 54) di stati compatti."""
+        n = len(states)
+        self._ensure_capacity(n)
+
+        shared_states = np.ndarray((self.capacity, 54), dtype=np.uint8, buffer=self.in_shm.buf)
+        shared_out = np.ndarray((self.capacity,), dtype=np.float64, buffer=self.out_shm.buf)
+        shared_states[:n] = states
+
+        bounds = np.linspace(0, n, self.n_workers + 1).astype(int)
+        tasks = [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        for start, end in tasks:
+            self.task_queue.put((self.in_shm.name, self.out_shm.name, self.capacity, start, end))
+
+        errors = []
+        for _ in tasks:
+            _, _, error = self._get_result()
+            if error is not None:
+                errors.append(error)
+        if errors:
+            raise RuntimeError(f"Errore nei worker di valutazione: {errors[0]}")
+
+        return shared_out[:n].copy()
+
+    def _get_result(self):
+        """
+        Attende un risultato controllando periodicamente i worker: se uno è morto (OOM, crash nel
+        caricamento del modello) il suo intervallo non arriverà mai e si solleva un errore invece di bloccarsi.
+        """
+        while True:
+            try:
+                return self.result_queue.get(timeout=self.poll_seconds)
+            except queue.Empty:
+                dead = [worker for worker in self.workers if not worker.is_alive()]
+                if dead:
+                    raise RuntimeError(f"{len(dead)} worker di valutazione terminati "
+                                       f"(exit code {dead[0].exitcode})")
+
+    def close(self):
+        for worker in self.workers:
+            if worker.is_alive():
+                self.task_queue.put(None)
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self.workers = []
+        self._release_buffers()
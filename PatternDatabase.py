@@ -0,0 +1,343 @@
+import os
+import time
+import heapq
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+from FastRubiksCube import FastRubiksCube, MOVES, MOVE_TABLE, CANONICAL_NEXT, CANONICAL_START
+from CubieCube import (cubies_from_stickers, corner_coord, edge6_coord, coordinate_tables,
+                       N_CORNER_PERM, N_CORNER_ORI, N_EDGE6, NUM_EDGES, EDGE_GROUP)
+
+
+UNSEEN = 255
+
+# Pattern database: (numero di stati, tipo di coordinata, cubetti tracciati)
+PDB_SPECS = {
+    'corners': (N_CORNER_PERM * N_CORNER_ORI, 'corners', None),
+    'edges_a': (N_EDGE6, 'edges', tuple(range(EDGE_GROUP))),
+    'edges_b': (N_EDGE6, 'edges', tuple(range(EDGE_GROUP, NUM_EDGES))),
+}
+
+
+def solved_index(name):
+    """Indice dello stato risolto nella coordinata del pattern database `name`."""
+    _, kind, pieces = PDB_SPECS[name]
+    corner_perm, corner_ori, edge_perm, edge_ori = cubies_from_stickers(FastRubiksCube().state)
+    if kind == 'corners':
+        return int(corner_coord(corner_perm, corner_ori)[0])
+    return int(edge6_coord(edge_perm, edge_ori, pieces)[0])
+
+
+def corner_neighbors(idx, tables, moves=slice(None)):
+    """Indici (N, k) degli angoli dopo ognuna delle mosse `moves`."""
+    cp, co = idx // N_CORNER_ORI, idx % N_CORNER_ORI
+    return tables['CP'][cp][..., moves].astype(np.int64) * N_CORNER_ORI + tables['CO'][co][..., moves]
+
+
+def edge6_neighbors(idx, tables, moves=slice(None)):
+    """Indici (N, k) dei 6 spigoli tracciati dopo ognuna delle mosse `moves`."""
+    pos, flips = idx >> 6, idx & 63
+    return (tables['E6_POS'][pos][..., moves].astype(np.int64) << 6) | \
+        (np.expand_dims(flips, -1) ^ tables['E6_FLIP'][pos][..., moves])
+
+
+_NEIGHBORS = {'corners': corner_neighbors, 'edges': edge6_neighbors}
+
+# Stato dei worker della BFS parallela
+_bfs_shm = None
+_bfs_table = None
+_bfs_kind = None
+
+
+def _bfs_init(shm_name, size, kind):
+    global _bfs_shm, _bfs_table, _bfs_kind
+    _bfs_shm = shared_memory.SharedMemory(name=shm_name)
+    _bfs_table = np.ndarray((size,), dtype=np.uint8, buffer=_bfs_shm.buf)
+    _bfs_kind = kind
+
+
+def _bfs_expand(task, table=None, kind=None, chunk_size=1 << 20):
+    """
+    Espande gli stati a distanza d nell'intervallo [start, end) e marca i vicini non visti con d + 1.
+    Le scritture concorrenti dei worker scrivono tutte lo stesso valore, quindi non servono lock.
+    """
+    d, start, end = task
+    table = _bfs_table if table is None else table
+    neighbors = _NEIGHBORS[_bfs_kind if kind is None else kind]
+    tables = coordinate_tables()
+
+    frontier = start + np.flatnonzero(table[start:end] == d)
+    for i in range(0, len(frontier), chunk_size):
+        nb = neighbors(frontier[i:i + chunk_size], tables).ravel()
+        nb = nb[table[nb] == UNSEEN]
+        table[nb] = d + 1
+    return len(frontier)
+
+
+def build_pdb(name, n_workers=None):
+    """
+    Genera il pattern database `name` con una BFS a livelli dallo stato risolto.
+    Ogni livello è diviso per intervalli di indici tra n_workers processi che lavorano
+    sulla stessa tabella in memoria condivisa. Restituisce la tabella compressa a 4 bit.
+    """
+    size, kind, _ = PDB_SPECS[name]
+    n_workers = n_workers or mp.cpu_count()
+    print(f"[*] Generazione pattern database '{name}' ({size} stati, {n_workers} core)...")
+    start_time = time.time()
+
+    # Tabelle generate prima del pool: con fork i worker le ereditano già pronte
+    coordinate_tables()
+    if os.name == 'posix':
+        resource_tracker.ensure_running()
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    table = np.ndarray((size,), dtype=np.uint8, buffer=shm.buf)
+    table[:] = UNSEEN
+    table[solved_index(name)] = 0
+
+    pool = mp.Pool(n_workers, initializer=_bfs_init, initargs=(shm.name, size, kind)) if n_workers > 1 else None
+    try:
+        bounds = np.linspace(0, size, 4 * n_workers + 1).astype(np.int64)
+        d = 0
+        while True:
+            tasks = [(d, int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+            if pool is not None:
+                expanded = sum(pool.map(_bfs_expand, tasks))
+            else:
+                expanded = sum(_bfs_expand(task, table, kind) for task in tasks)
+            if expanded == 0:
+                break
+            print(f"    - Distanza {d}: {expanded} stati")
+            d += 1
+
+        # Nibble a 4 bit: le distanze oltre 15 vengono saturate (resta ammissibile)
+        values = np.minimum(table, 15)
+        packed = (values[0::2] | (values[1::2] << 4)).astype(np.uint8)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        del table
+        shm.close()
+        shm.unlink()
+
+    print(f"[+] '{name}' generato in {(time.time() - start_time) / 60:.2f} minuti.")
+    return packed
+
+
+def build_all(directory='pdb', n_workers=None):
+    os.makedirs(directory, exist_ok=True)
+    for name in PDB_SPECS:
+        np.save(os.path.join(directory, f"{name}.npy"), build_pdb(name, n_workers))
+
+
+class PatternDatabase:
+    """Pattern database compresso a 4 bit per stato, letto in memory-map."""
+
+    def __init__(self, packed):
+        self.packed = packed
+
+    @classmethod
+    def load(cls, directory, name):
+        return cls(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r'))
+
+    def get(self, idx):
+        idx = np.asarray(idx, dtype=np.int64)
+        return (self.packed[idx >> 1] >> ((idx & 1) << 2)) & 15
+
+
+class _SearchAborted(Exception):
+    pass
+
+
+class PDBSolver:
+    """
+    Motore alternativo alla beam search: IDA* (pesato se weight > 1) sulle coordinate dei cubetti,
+    con euristica max(PDB angoli, PDB spigoli A, PDB spigoli B). Con weight=1 la soluzione è ottima
+    (metrica quarter-turn). Il modello appreso può essere usato come tie-breaker tra figli con pari h.
+    """
+
+    def __init__(self, directory='pdb'):
+        print(f"[*] Caricamento pattern database da '{directory}'...")
+        self.tables = coordinate_tables()
+        self.corners = PatternDatabase.load(directory, 'corners')
+        self.edges_a = PatternDatabase.load(directory, 'edges_a')
+        self.edges_b = PatternDatabase.load(directory, 'edges_b')
+        self.solved = (solved_index('corners'), solved_index('edges_a'), solved_index('edges_b'))
+
+    def coordinates(self, cube):
+        corner_perm, corner_ori, edge_perm, edge_ori = cubies_from_stickers(FastRubiksCube.from_cube(cube).state)
+        return (int(corner_coord(corner_perm, corner_ori)[0]),
+                int(edge6_coord(edge_perm, edge_ori, PDB_SPECS['edges_a'][2])[0]),
+                int(edge6_coord(edge_perm, edge_ori, PDB_SPECS['edges_b'][2])[0]))
+
+    def heuristic(self, corners, edges_a, edges_b):
+        return np.maximum(np.maximum(self.corners.get(corners), self.edges_a.get(edges_a)),
+                          self.edges_b.get(edges_b))
+
+    def solve(self, cube, weight=1.0, timeout_seconds=None, max_nodes=None, tie_breaker=None,
+              cancel_event=None):
+        """
+        Con weight=1 IDA* (soluzione ottima), con weight > 1 A* pesato a lotti (soluzione entro
+        weight volte l'ottimo, molto più rapida sugli scramble profondi).
+        Restituisce (lista di mosse (face, reverse), nodi espansi), oppure (None, nodi)
+        allo scadere di timeout/max_nodes o se cancel_event viene impostato.
+        tie_breaker: funzione opzionale (k, 54) stati -> punteggi, usata a parità di h.
+        """
+        cube = FastRubiksCube.from_cube(cube)
+        if cube.is_solved():
+            return [], 0
+
+        self._deadline = time.time() + timeout_seconds if timeout_seconds else None
+        self._max_nodes = max_nodes
+        self._cancel_event = cancel_event
+        try:
+            if weight <= 1.0:
+                path, nodes = self._ida_star(cube, tie_breaker)
+            else:
+                path, nodes = self._weighted_astar(cube, weight, tie_breaker)
+        except _SearchAborted as aborted:
+            return None, aborted.args[0]
+        return ([MOVES[m] for m in path] if path is not None else None), nodes
+
+    def _check_abort(self, nodes):
+        if (self._deadline and time.time() > self._deadline) or \
+                (self._max_nodes and nodes > self._max_nodes) or \
+                (self._cancel_event is not None and self._cancel_event.is_set()):
+            raise _SearchAborted(nodes)
+
+    def _children(self, c, a, b, canon):
+        """Figli canonici di uno o più nodi, generati tutti insieme: (mosse, canon, angoli, spigoli A, B)."""
+        next_canon = CANONICAL_NEXT[canon]
+        valid = next_canon >= 0
+        cc = corner_neighbors(c, self.tables)[valid]
+        aa = edge6_neighbors(a, self.tables)[valid]
+        bb = edge6_neighbors(b, self.tables)[valid]
+        moves = np.nonzero(valid)[-1]
+        return moves, next_canon[valid], cc, aa, bb
+
+    def _ida_star(self, cube, tie_breaker):
+        solved_c, solved_a, solved_b = self.solved
+        path = []
+        nodes = 0
+        # Senza tie-breaker un nodo costa microsecondi e basta controllare ogni 2000;
+        # con il tie-breaker ogni nodo è una chiamata al modello, quindi si controlla sempre
+        check_every = 1 if tie_breaker is not None else 2000
+
+        def search(c, a, b, state, canon, g, bound):
+            nonlocal nodes
+            nodes += 1
+            if nodes % check_every == 0:
+                self._check_abort(nodes)
+
+            moves, next_canon, cc, aa, bb = self._children(c, a, b, canon)
+            goal = np.flatnonzero((cc == solved_c) & (aa == solved_a) & (bb == solved_b))
+            if len(goal):
+                path.append(int(moves[goal[0]]))
+                return True, 0
+
+            h = self.heuristic(cc, aa, bb)
+            f = g + 1 + h
+            child_states = state[MOVE_TABLE[moves]] if state is not None else None
+            if tie_breaker is not None:
+                order = np.lexsort((tie_breaker(child_states), h))
+            else:
+                order = np.argsort(h, kind='stable')
+
+            next_bound = float('inf')
+            for k in order:
+                if f[k] > bound:
+                    next_bound = min(next_bound, f[k])
+                    continue
+                path.append(int(moves[k]))
+                found, t = search(int(cc[k]), int(aa[k]), int(bb[k]),
+                                  child_states[k] if state is not None else None,
+                                  next_canon[k], g + 1, bound)
+                if found:
+                    return True, t
+                path.pop()
+                next_bound = min(next_bound, t)
+            return False, next_bound
+
+        c, a, b = self.coordinates(cube)
+        state = cube.state if tie_breaker is not None else None
+        bound = int(self.heuristic(c, a, b))
+        while True:
+            found, bound = search(c, a, b, state, CANONICAL_START, 0, bound)
+            if found:
+                return path, nodes
+            if bound == float('inf'):
+                return None, nodes
+
+    def _weighted_astar(self, cube, weight, tie_breaker, batch_size=64):
+        """
+        A* pesato (f = g + weight * h): a ogni passo estrae dalla coda i batch_size nodi migliori
+        e li espande insieme. Gli stati già visti con g minore o uguale vengono scartati.
+        """
+        solved_c, solved_a, solved_b = self.solved
+        c, a, b = self.coordinates(cube)
+
+        # Nodi in liste parallele: coordinate, g, stato canonico, padre, mossa (e sticker se serve)
+        coords = [(c, a, b)]
+        g_cost, canons, parents, node_moves = [0], [CANONICAL_START], [-1], [-1]
+        states = [cube.state] if tie_breaker is not None else None
+        best_g = {(c, a, b): 0}
+        h0 = int(self.heuristic(c, a, b))
+        # (f, h, tie-break, id): a parità di f e h vince il nodo generato prima
+        queue = [(weight * h0, h0, 0.0, 0)]
+        nodes = 0
+
+        while queue:
+            self._check_abort(nodes)
+            batch = [heapq.heappop(queue) for _ in range(min(batch_size, len(queue)))]
+            ids = np.array([node for _, _, _, node in batch])
+            # I nodi superati da un percorso migliore trovato dopo l'inserimento sono obsoleti
+            ids = ids[[g_cost[i] == best_g[coords[i]] for i in ids]]
+            if len(ids) == 0:
+                continue
+            nodes += len(ids)
+
+            batch_coords = np.array([coords[i] for i in ids], dtype=np.int64)
+            moves, next_canon, cc, aa, bb = self._children(
+                batch_coords[:, 0], batch_coords[:, 1], batch_coords[:, 2],
+                np.array([canons[i] for i in ids]))
+            parent_rows = np.nonzero(CANONICAL_NEXT[np.array([canons[i] for i in ids])] >= 0)[0]
+            parent_ids = ids[parent_rows]
+
+            goal = np.flatnonzero((cc == solved_c) & (aa == solved_a) & (bb == solved_b))
+            if len(goal):
+                path = [int(moves[goal[0]])]
+                node = int(parent_ids[goal[0]])
+                while parents[node] >= 0:
+                    path.append(node_moves[node])
+                    node = parents[node]
+                return path[::-1], nodes
+
+            h = self.heuristic(cc, aa, bb)
+            g = np.array([g_cost[i] for i in parent_ids]) + 1
+            f = g + weight * h
+            if tie_breaker is not None:
+                child_states = np.stack([states[i] for i in parent_ids])
+                child_states = child_states[np.arange(len(moves))[:, None], MOVE_TABLE[moves]]
+                ties = tie_breaker(child_states)
+
+            for k in range(len(moves)):
+                key = (int(cc[k]), int(aa[k]), int(bb[k]))
+                if best_g.get(key, 1 << 30) <= g[k]:
+                    continue
+                best_g[key] = int(g[k])
+                node = len(coords)
+                coords.append(key)
+                g_cost.append(int(g[k]))
+                canons.append(int(next_canon[k]))
+                parents.append(int(parent_ids[k]))
+                node_moves.append(int(moves[k]))
+                if tie_breaker is not None:
+                    states.append(child_states[k])
+                heapq.heappush(queue, (float(f[k]), int(h[k]), float(ties[k]) if tie_breaker is not None else 0.0, node))
+
+        return None, nodes
+
+
+if __name__ == "__main__":
+    mp.freeze_support()
+    build_all('pdb')
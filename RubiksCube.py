@@ -1,10 +1,7 @@
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
 import numpy as np
-from matplotlib.patches import Polygon
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
 from itertools import product
 import random
+from FastRubiksCube import MOVES
 
 
 
@@ -28,6 +25,15 @@ class RubiksCube:
     def print_cube(self):
         print(self.cube)
 
+    def clone(self):
+        """Copia veloce: duplica solo il tensore, senza passare da copy.deepcopy."""
+        new = RubiksCube.__new__(RubiksCube)
+        new.cube = self.cube.copy()
+        return new
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
     def rotate_face(self, face, reverse=False):
         # maps a face to the section of the tensor which needs to be rotated
         rot_map = {
@@ -55,100 +61,29 @@ class RubiksCube:
         # overwriting cube
         self.cube[rot_map[face]] = rotated_slice
 
+    def apply_move(self, move_id):
+        # stessa API di FastRubiksCube: move_id è l'indice in MOVES, la rotazione è in place sul tensore
+        face, reverse = MOVES[move_id]
+        self.rotate_face(face, reverse=reverse)
+
+    def undo_move(self, move_id):
+        # annulla apply_move(move_id) ruotando la stessa faccia nel verso opposto
+        face, reverse = MOVES[move_id]
+        self.rotate_face(face, reverse=not reverse)
+
     def _rotate_cube_180(self):
         # Rotate the cube 180 degrees
         rotated_cube = np.rot90(self.cube, k=2, axes=(0,1))
         rotated_cube = np.rot90(rotated_cube, k=1, axes=(1,2))
         return rotated_cube
 
-    def visualize_opposite_corners(self, return_fig = False):
-        # Create a new figure with two subplots
-        fig = plt.figure(figsize=(20, 10))
-
-        # Color mapping
-        color_map = {
-            'w': 'white',
-            'g': 'green',
-            'r': 'red',
-            'y': 'yellow',
-            'b': 'blue',
-            'o': 'orange'
-        }
-
-        # Cubes to visualize: original and 180-degree rotated
-        cubes_to_render = [
-            {
-                'cube_data': self.cube,
-                'title': 'View 1'
-            },
-            {
-                'cube_data': self._rotate_cube_180(),
-                'title': 'View 2'
-            }
-        ]
-
-        # Create subplots for each view
-        for i, cube_info in enumerate(cubes_to_render, 1):
-            ax = fig.add_subplot(1, 2, i, projection='3d')
-
-            ax.view_init(elev=-150, azim=45, vertical_axis='x')
-
-            # Iterate through the cube and plot non-empty stickers
-            cube_data = cube_info['cube_data']
-            for x in range(cube_data.shape[0]):
-                for y in range(cube_data.shape[1]):
-                    for z in range(cube_data.shape[2]):
-                        # Only plot if there's a color
-                        if cube_data[x, y, z] != '':
-                            color = color_map.get(cube_data[x, y, z], 'gray')
-
-                            # Define the 8 vertices of the small cube
-                            vertices = [
-                                [x, y, z], [x+1, y, z],
-                                [x+1, y+1, z], [x, y+1, z],
-                                [x, y, z+1], [x+1, y, z+1],
-                                [x+1, y+1, z+1], [x, y+1, z+1]
-                            ]
-
-                            # Define the faces of the cube
-                            faces = [
-                                [vertices[0], vertices[1], vertices[2], vertices[3]],  # bottom
-                                [vertices[4], vertices[5], vertices[6], vertices[7]],  # top
-                                [vertices[0], vertices[1], vertices[5], vertices[4]],  # front
-                                [vertices[2], vertices[3], vertices[7], vertices[6]],  # back
-                                [vertices[1], vertices[2], vertices[6], vertices[5]],  # right
-                                [vertices[0], vertices[3], vertices[7], vertices[4]]   # left
-                            ]
-
-                            # Plot each face
-                            for face in faces:
-                                poly = Poly3DCollection([face], alpha=1, edgecolor='black')
-                                poly.set_color(color)
-                                poly.set_edgecolor('black')
-                                ax.add_collection3d(poly)
-
-            # Set axis limits and equal aspect ratio
-            ax.set_xlim(0, 5)
-            ax.set_ylim(0, 5)
-            ax.set_zlim(0, 5)
-            ax.set_box_aspect((1, 1, 1))
-
-            # Remove axis labels and ticks
-            ax.set_xticks([])
-            ax.set_yticks([])
-            ax.set_zticks([])
-            ax.set_xlabel('')
-            ax.set_ylabel('')
-            ax.set_zlabel('')
-            ax.set_title(cube_info['title'])
-
-        plt.tight_layout()
-
-        #return figure instead of rendering it
-        if return_fig:
-            return fig
-
-        plt.show()
+    def visualize_opposite_corners(self, return_fig = False, fig = None):
+        """
+        Due viste 3D opposte del cubo (vedi CubePlot.plot_views).
+        matplotlib viene importato qui, al primo rendering: il resto del modulo usa solo NumPy.
+        """
+        from CubePlot import plot_views
+        return plot_views([self.cube, self._rotate_cube_180()], return_fig=return_fig, fig=fig)
 
     def get_state(self):
         # 1. Estrazione dei 54 sticker (come fatto prima)
@@ -220,8 +155,13 @@ class RubiksCube:
 
     def is_solved(self):
         """Verifica se il cubo è in stato risolto."""
-        # Se tutti i quadratini sono alla distanza 0 dalla loro faccia, è risolto
-        return np.all(self.get_manhattan_features() == 0)
+        # Confronto diretto con il tensore risolto precalcolato (nessuna feature Manhattan)
+        return np.array_equal(self.cube, SOLVED_CUBE)
+
+
+# Tensore del cubo risolto, usato come firma da RubiksCube.is_solved
+SOLVED_CUBE = RubiksCube().cube
+
 
 if __name__ == "__main__":
     cube=RubiksCube()
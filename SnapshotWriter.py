@@ -0,0 +1,148 @@
+import os
+import queue
+import threading
+from PIL import Image, ImageDraw, ImageFont
+
+COLOR_MAP = {'w': 'white', 'y': 'yellow', 'g': 'green', 'b': 'blue', 'r': 'red', 'o': 'orange'}
+
+# Formati di esportazione: un PNG per mossa oppure un unico file per tutta la soluzione
+EXPORT_FORMATS = ['png', 'gif', 'apng', 'sprite']
+
+
+def face_views(cube):
+    """Le 6 facce 3x3 del tensore di RubiksCube, nell'ordine usato dalla GUI."""
+    return {
+        'U': cube[0, 1:4, 1:4], 'D': cube[4, 1:4, 1:4],
+        'F': cube[1:4, 0, 1:4], 'B': cube[1:4, 4, 1:4],
+        'L': cube[1:4, 1:4, 0], 'R': cube[1:4, 1:4, 4]
+    }
+
+
+class SnapshotRenderer:
+    """
+    Disegna uno snapshot del cubo con PIL. Font, cornice statica (sfondo, separatore, footer)
+    e coordinate dei 54 sticker vengono preparati una sola volta; ogni frame copia la cornice
+    e disegna solo titolo e sticker.
+    """
+
+    SIZE = (650, 520)
+
+    def __init__(self):
+        try:
+            self.font_main = ImageFont.truetype("arial.ttf", 22)
+            self.font_small = ImageFont.truetype("arial.ttf", 14)
+        except OSError:
+            self.font_main = self.font_small = None
+
+        self.frame = Image.new('RGB', self.SIZE, "#ecf0f1")
+        draw = ImageDraw.Draw(self.frame)
+        draw.line((20, 50, 630, 50), fill="#bdc3c7", width=2)
+        draw.text((480, 490), "MagicSolver", fill="#7f8c8d", font=self.font_small)
+
+        size = 35
+        offsets = {
+            'U': (size * 3 + 20, 70), 'L': (20, size * 3 + 70), 'F': (size * 3 + 20, size * 3 + 70),
+            'R': (size * 6 + 20, size * 3 + 70), 'B': (size * 9 + 20, size * 3 + 70),
+            'D': (size * 3 + 19, size * 6 + 70)
+        }
+        # (faccia, riga, colonna, rettangolo)
+        self.stickers = [
+            (face, r, c, [ox + c * size, oy + r * size, ox + c * size + size - 2, oy + r * size + size - 2])
+            for face, (ox, oy) in offsets.items() for r in range(3) for c in range(3)
+        ]
+
+    def render(self, cube, title):
+        """cube: tensore (5, 5, 5) di RubiksCube (o una sua copia)."""
+        img = self.frame.copy()
+        draw = ImageDraw.Draw(img)
+        draw.text((20, 15), title, fill="#2c3e50", font=self.font_main)
+        faces = face_views(cube)
+        for face, r, c, box in self.stickers:
+            draw.rectangle(box, fill=COLOR_MAP.get(faces[face][r, c], 'gray'), outline="#2c3e50")
+        return img
+
+
+def export_animation(cube, moves, path, fmt='gif', frame_ms=800, renderer=None, columns=6):
+    """
+    Esporta l'intera soluzione in un solo file, in un'unica passata sulla lista di mosse:
+    GIF o APNG animati, oppure sprite sheet (griglia di frame in un PNG).
+    cube: RubiksCube di partenza (non viene modificato).
+    """
+    renderer = renderer or SnapshotRenderer()
+    cube = cube.clone()
+    frames = [renderer.render(cube.cube, "STEP #0: INIZIO")]
+    for step, (face, reverse) in enumerate(moves, start=1):
+        cube.rotate_face(face, reverse=reverse)
+        frames.append(renderer.render(cube.cube, f"STEP #{step}: {face.upper()} {'(REV)' if reverse else ''}"))
+
+    if fmt == 'gif':
+        frames[0].save(path, save_all=True, append_images=frames[1:], duration=frame_ms, loop=0)
+    elif fmt == 'apng':
+        frames[0].save(path, format='PNG', save_all=True, append_images=frames[1:], duration=frame_ms, loop=0)
+    elif fmt == 'sprite':
+        width, height = renderer.SIZE
+        rows = (len(frames) + columns - 1) // columns
+        sheet = Image.new('RGB', (width * min(columns, len(frames)), height * rows), "#ecf0f1")
+        for i, frame in enumerate(frames):
+            sheet.paste(frame, ((i % columns) * width, (i // columns) * height))
+        sheet.save(path)
+    else:
+        raise ValueError(f"Formato di esportazione sconosciuto: {fmt}")
+    return path
+
+
+class SnapshotWriter:
+    """
+    Scrittore in background degli snapshot: la GUI accoda solo una copia del tensore del cubo,
+    rendering e salvataggio avvengono in un thread dedicato. close() attende la fine della coda;
+    il thread non è daemon, quindi all'uscita dell'interprete i file in coda vengono comunque completati.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.renderer = SnapshotRenderer()
+        self.queue = queue.Queue()
+        self.errors = []
+        self.thread = threading.Thread(target=self._run)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                job = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                # Programma terminato senza close(): coda esaurita, il thread non deve tenerlo in vita
+                if not threading.main_thread().is_alive():
+                    break
+                continue
+            if job is None:
+                break
+            try:
+                job()
+            except Exception as e:
+                self.errors.append(repr(e))
+                print(f"[-] Errore nel salvataggio degli snapshot: {e}")
+
+    def submit(self, filename, move_text, step_num, cube):
+        """Accoda uno snapshot PNG; cube viene copiato subito, la GUI può continuare a modificarlo."""
+        cube = cube.copy()
+        path = os.path.join(self.output_dir, f"{filename}.png")
+        self.queue.put(lambda: self.renderer.render(cube, f"STEP #{step_num}: {move_text}").save(path))
+
+    def submit_animation(self, filename, cube, moves, fmt='gif', frame_ms=800):
+        """Accoda l'esportazione dell'intera soluzione in un unico file (vedi export_animation)."""
+        cube = cube.clone()
+        moves = list(moves)
+        extension = 'png' if fmt in ('apng', 'sprite') else fmt
+        path = os.path.join(self.output_dir, f"{filename}.{extension}")
+        self.queue.put(lambda: export_animation(cube, moves, path, fmt, frame_ms, self.renderer))
+        return path
+
+    def close(self, wait=True):
+        """Chiude la coda; con wait=False il thread finisce i lavori in sospeso da solo (vedi busy)."""
+        self.queue.put(None)
+        if wait:
+            self.thread.join()
+
+    def busy(self):
+        return self.thread.is_alive()
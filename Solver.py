@@ -1,31 +1,249 @@
 import joblib
 import numpy as np
-import copy
 import os
 import time
 import random
+import multiprocessing as mp
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from ParallelEvaluator import ParallelEvaluator
+from EndgameTable import EndgameTable
+from PatternDatabase import PDBSolver
+from CubieCube import cubie_keys
+from HeuristicCache import LRUHeuristicCache, DiskHeuristicCache, model_fingerprint
+from FastRubiksCube import (FastRubiksCube, CubeBatch, MOVES, MOVE_TABLE, SOLVED_STATE, CANONICAL_NEXT,
+                            CANONICAL_START)
 
 os.environ['OMP_NUM_THREADS'] = '1'
 os.environ['MKL_NUM_THREADS'] = '1'
 
+# Tipi di livello di ricerca. kind ('beam' o 'pdb') decide come lo esegue RubiksSolver._run_level.
+BeamLevel = namedtuple('BeamLevel', ['beam_width', 'max_depth', 'restart_prob', 'timeout_seconds', 'epsilon',
+                                     'kind'], defaults=('beam',))
+PDBLevel = namedtuple('PDBLevel', ['weight', 'timeout_seconds', 'kind'], defaults=('pdb',))
+
+# Livelli di ricerca di solve_adaptive_ultra
+SEARCH_LEVELS = [
+    # LIVELLO 1: Rapido (Cerca la via più breve), timeout aggressivo
+    BeamLevel(beam_width=250, max_depth=25, restart_prob=0.1, timeout_seconds=10, epsilon=1.0),
+    # LIVELLO 2: Espansivo (Bilanciato). Aumentiamo epsilon: diamo più peso all'IA per superare l'incertezza.
+    BeamLevel(beam_width=1200, max_depth=55, restart_prob=0.3, timeout_seconds=45, epsilon=1.2),
+    # LIVELLO 3: Esplorazione profonda (due tentativi)
+    BeamLevel(beam_width=800, max_depth=80, restart_prob=0.7, timeout_seconds=120, epsilon=1.5),
+    BeamLevel(beam_width=800, max_depth=80, restart_prob=0.7, timeout_seconds=120, epsilon=1.5),
+]
+
+# Livello IDA*/A* pesato sui pattern database (solo se il solver ha pdb_dir). Gira dopo il primo livello della beam.
+PDB_LEVEL = PDBLevel(weight=2.0, timeout_seconds=30)
+
+def top_k_indices(scores, k):
+    """
+    Indici dei k punteggi minori, ordinati per punteggio e a parità per indice (come un sort stabile).
+    Selezione parziale con argpartition: si ordinano solo i sopravvissuti, non tutto il livello.
+    """
+    if k >= len(scores):
+        return np.argsort(scores, kind='stable')
+    threshold = scores[np.argpartition(scores, k - 1)[k - 1]]
+    # Tutti i pari merito della soglia entrano tra i candidati: vince l'indice minore
+    candidates = np.flatnonzero(scores <= threshold)
+    return candidates[np.lexsort((candidates, scores[candidates]))[:k]]
+
+
+# Solver del processo worker della modalità portfolio (uno per processo)
+_worker_solver = None
+_worker_cancel_event = None
+
+
+def _portfolio_init(solver_kwargs, cancel_event):
+    """Inizializzatore dei worker: carica il modello una sola volta per processo."""
+    global _worker_solver, _worker_cancel_event
+    _worker_solver = RubiksSolver(**solver_kwargs)
+    _worker_cancel_event = cancel_event
+
+
+def _portfolio_run(state, level, seed):
+    """
+    Esegue un livello di ricerca (beam o pattern database) nel worker con un seed dedicato.
+    Le predizioni nuove vanno nella cache su disco a fine livello: i worker non passano da close().
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        return _worker_solver._run_level([FastRubiksCube(state)], level, cancel_event=_worker_cancel_event)[0]
+    finally:
+        _worker_solver.save_disk_cache()
+
+
+class _Beam:
+    """
+    Stato di una beam search avanzabile un livello alla volta (usata da solve_beam_ultra e solve_beam_many).
+    La frontiera è una struttura di array: matrice (N, 54) degli stati e stato canonico per nodo;
+    per ogni livello si tengono solo indice del padre e mossa dei sopravvissuti.
+    """
+
+    def __init__(self, start_state, beam_width, restart_prob, epsilon, timeout_seconds=None):
+        self.beam_width = beam_width
+        self.restart_prob = restart_prob
+        self.epsilon = epsilon
+        self.states = np.asarray(start_state, dtype=np.uint8)[None, :]
+        self.canons = np.array([CANONICAL_START], dtype=np.int8)
+        # level_parents[d][i] / level_moves[d][i]: padre nella frontiera d e mossa del nodo i della frontiera d + 1
+        self.level_parents, self.level_moves = [], []
+        # Tabella di trasposizione: chiave dei cubetti -> profondità minima a cui è stato generato
+        self.transposition = {int(cubie_keys(start_state)[0]): 0}
+        self.duplicates_per_level = []
+        self.total_nodes = 0
+        self.depth = 0
+        self.prev_best_h = float('inf')
+        self.stagnation_counter = 0
+        self.path = None
+        # Figli del livello corrente in attesa dei punteggi (select)
+        self.pending = None
+        # Nodo della frontiera corrente con h minima (per i percorsi parziali)
+        self.best_h = float('inf')
+        self.best_node = 0
+        # Ricerca interrotta da cancel_event (vedi RubiksSolver._beam_steps)
+        self.cancelled = False
+        # Scadenza propria della beam (solve_beam_many): None senza timeout
+        self.start_time = time.time()
+        self.deadline = self.start_time + timeout_seconds if timeout_seconds else None
+
+    def expired(self):
+        return self.deadline is not None and time.time() > self.deadline
+
+    def build_path(self, moves, node):
+        """Mosse dal cubo iniziale al nodo `node` dell'ultima frontiera, seguite da `moves`."""
+        path = []
+        for level in range(len(self.level_parents) - 1, -1, -1):
+            path.append(MOVES[self.level_moves[level][node]])
+            node = self.level_parents[level][node]
+        return path[::-1] + [MOVES[m] for m in moves]
+
+    def expand(self, endgame_table=None):
+        """
+        Genera il livello successivo. Restituisce la matrice dei figli da valutare, oppure None
+        se la ricerca è finita: in quel caso self.path è la soluzione (o None se la beam è vuota).
+        """
+        depth = self.depth
+        # Solo i successori canonici (niente inverse, terzi quarti di giro
+        # o facce opposte in ordine decrescente), generati per tutta la frontiera insieme
+        next_canons = CANONICAL_NEXT[self.canons]
+        parent_idx, move_ids = np.nonzero(next_canons >= 0)
+        children = self.states[parent_idx[:, None], MOVE_TABLE[move_ids]]
+        child_canons = next_canons[parent_idx, move_ids]
+        self.total_nodes += len(children)
+
+        solved = np.flatnonzero((children == SOLVED_STATE).all(axis=1))
+        if len(solved):
+            print(f"   >> Risolto d={depth + 1} | Nodi={self.total_nodes} | "
+                  f"Duplicati={sum(self.duplicates_per_level)}")
+            self.path = self.build_path([move_ids[solved[0]]], parent_idx[solved[0]])
+            return None
+
+        # Stati già visti a profondità uguale o minore: niente feature né predict.
+        # Le chiavi dei cubetti si calcolano per tutto il livello in un'unica passata e vengono
+        # riusate dalle cache delle predizioni (vedi pending_keys).
+        keys = cubie_keys(children)
+        fresh = []
+        for i, state_key in enumerate(keys.tolist()):
+            if self.transposition.get(state_key, depth + 2) <= depth + 1:
+                continue
+            self.transposition[state_key] = depth + 1
+            fresh.append(i)
+        self.duplicates_per_level.append(len(children) - len(fresh))
+        if not fresh:
+            return None
+
+        fresh = np.array(fresh)
+        children, parent_idx, move_ids, child_canons, keys = \
+            children[fresh], parent_idx[fresh], move_ids[fresh], child_canons[fresh], keys[fresh]
+
+        # Un figlio nella tabella di finale chiude la ricerca: il resto del percorso è noto
+        if endgame_table is not None:
+            distances, _ = endgame_table.lookup(children)
+            if (distances >= 0).any():
+                best = int(np.argmin(np.where(distances >= 0, distances, np.iinfo(distances.dtype).max)))
+                ending = endgame_table.complete(FastRubiksCube(children[best]))
+                if ending is not None:
+                    print(f"   >> Risolto d={depth + 1 + len(ending)} (finale da tabella) | "
+                          f"Nodi={self.total_nodes}")
+                    self.path = self.build_path([move_ids[best]], parent_idx[best]) + ending
+                    return None
+
+        self.pending = (children, parent_idx, move_ids, child_canons, keys)
+        return children
+
+    @property
+    def pending_keys(self):
+        """Chiavi dei cubetti (uint64) dei figli restituiti dall'ultima expand."""
+        return self.pending[4]
+
+    def select(self, heuristics):
+        """Tiene i migliori beam_width figli (o élite + campione casuale al restart) come nuova frontiera."""
+        children, parent_idx, move_ids, child_canons, _ = self.pending
+        self.pending = None
+        beam_width = self.beam_width
+        f_scores = (self.depth + 1) + heuristics * self.epsilon
+
+        current_best_h = heuristics[np.argmin(f_scores)]
+        if current_best_h >= self.prev_best_h:
+            self.stagnation_counter += 1
+        else:
+            self.stagnation_counter = 0
+        self.prev_best_h = current_best_h
+
+        if np.random.random() < self.restart_prob or self.stagnation_counter >= 3:
+            # Restart: élite migliore più un campione uniforme (senza ripetizioni) del resto
+            elite = top_k_indices(f_scores, min(10, beam_width // 4))
+            rest = np.ones(len(f_scores), dtype=bool)
+            rest[elite] = False
+            rest = np.flatnonzero(rest)
+            sampled = np.random.choice(rest, min(len(rest), beam_width - len(elite)), replace=False)
+            selected = np.concatenate([elite, np.sort(sampled)])
+            self.stagnation_counter = 0
+        else:
+            selected = top_k_indices(f_scores, beam_width)
+
+        self.states, self.canons = children[selected], child_canons[selected]
+        self.level_parents.append(parent_idx[selected])
+        self.level_moves.append(move_ids[selected])
+        self.depth += 1
+        self.best_node = int(np.argmin(heuristics[selected]))
+        self.best_h = float(heuristics[selected][self.best_node])
+
 
 class RubiksSolver:
-    def __init__(self, pipeline='OHE'):
+    def __init__(self, pipeline='OHE', cache_size=500000, persistent_cache=False, disk_cache=None,
+                 disk_cache_capacity=1 << 24, n_workers=0, endgame_table=None, heuristic_mode='model', exact_radius=4,
+                 pdb_dir=None, pdb_tie_breaker=False):
         self.pipeline = pipeline
+        self.heuristic_mode = heuristic_mode
+        # Parametri per ricreare lo stesso solver nei processi worker
+        self.solver_kwargs = {'pipeline': pipeline, 'cache_size': cache_size,
+                              'persistent_cache': persistent_cache, 'disk_cache': disk_cache,
+                              'disk_cache_capacity': disk_cache_capacity,
+                              'endgame_table': endgame_table, 'heuristic_mode': heuristic_mode,
+                              'exact_radius': exact_radius, 'pdb_dir': pdb_dir,
+                              'pdb_tie_breaker': pdb_tie_breaker}
+        self._portfolio = None
         self.moves = ['top', 'bottom', 'front', 'back', 'left', 'right']
-        self.prediction_cache = {}
-        self.cache_hits = 0
-        self.cache_misses = 0
+        # Cache LRU condivisa da euristica singola e predict batch.
+        # Con persistent_cache=True sopravvive tra una risoluzione e l'altra.
+        self.prediction_cache = LRUHeuristicCache(cache_size)
+        self.persistent_cache = persistent_cache
+        # Duplicati scartati dalla tabella di trasposizione, per livello dell'ultima ricerca
+        self.duplicates_per_level = []
 
         print(f"[*] Inizializzazione Solver. Pipeline selezionata: {pipeline}")
 
         try:
             if pipeline == 'OHE':
                 print("[*] Caricamento modello OHE...")
-                self.model = joblib.load('magic_solver_model.joblib')
+                self.model_path = 'magic_solver_model.joblib'
             else:
                 print("[*] Caricamento modello Manhattan...")
-                self.model = joblib.load('magic_solver_manhattan.joblib')
+                self.model_path = 'magic_solver_manhattan.joblib'
+            self.model = joblib.load(self.model_path)
         except FileNotFoundError as e:
             print(f"[-] ERRORE: {e}")
             exit()
@@ -40,127 +258,482 @@ class RubiksSolver:
                 if hasattr(est, 'verbose'):
                     est.verbose = 0
 
+        # Cache opzionale su disco (file mappato in memoria), condivisa tra processi.
+        # L'impronta di pipeline e modello impedisce di riusare le predizioni di un altro modello.
+        # disk_cache_capacity: slot della tabella se il file va creato (vedi DiskHeuristicCache.create).
+        self.disk_cache = None
+        if disk_cache:
+            fingerprint = model_fingerprint(pipeline, self.model_path)
+            if os.path.isfile(disk_cache):
+                self.disk_cache = DiskHeuristicCache(disk_cache, fingerprint)
+            else:
+                print(f"[*] Creazione cache su disco '{disk_cache}'...")
+                self.disk_cache = DiskHeuristicCache.create(disk_cache, disk_cache_capacity, fingerprint)
+
+        # Tabella di finale opzionale (prefisso dei file generati da EndgameTable.py)
+        self.endgame_table = None
+        if endgame_table:
+            print(f"[*] Caricamento tabella di finale '{endgame_table}'...")
+            self.endgame_table = EndgameTable.load(endgame_table)
+
+        # Modalità 'hybrid': distanza esatta per gli stati vicini al risolto, modello solo fuori dal raggio.
+        # Se c'è già una tabella di finale la si riusa, altrimenti se ne genera una piccola in memoria.
+        self.exact_index = None
+        if heuristic_mode == 'hybrid':
+            self.exact_index = self.endgame_table if self.endgame_table is not None else \
+                EndgameTable.build(depth=exact_radius)
+
+        # Pattern database opzionali (cartella generata da PatternDatabase.py) per il livello PDB_LEVEL
+        self.pdb_solver = PDBSolver(pdb_dir) if pdb_dir else None
+        self.pdb_tie_breaker = pdb_tie_breaker
+
+        # Valutatore parallelo opzionale: ogni worker ha la propria copia del modello
+        self.evaluator = None
+        if n_workers > 1:
+            print(f"[*] Avvio di {n_workers} worker di valutazione...")
+            self.evaluator = ParallelEvaluator(self.model_path, pipeline, n_workers)
+
+    @property
+    def cache_hits(self):
+        return self.prediction_cache.hits
+
+    @property
+    def cache_misses(self):
+        return self.prediction_cache.misses
+
     def get_heuristic_cached(self, cube):
         """Euristica con paracadute per evitare falsi positivi."""
         if cube.is_solved():
             return 0
 
-        # Selezione features in base alla pipeline
-        feat = cube.get_state() if self.pipeline == 'OHE' else cube.get_manhattan_features()
-        state_hash = hash(feat.tobytes())
-
-        if state_hash in self.prediction_cache:
-            self.cache_hits += 1
-            return self.prediction_cache[state_hash]
-
-        self.cache_misses += 1
-        raw_prediction = self.model.predict(feat.reshape(1, -1))[0]
+        raw_prediction = self.predict_batch(FastRubiksCube.from_cube(cube).state[None, :])[0]
         heuristic = int(np.round(raw_prediction))
 
         if heuristic <= 0:
             heuristic = 1
 
-        self.prediction_cache[state_hash] = heuristic
         return heuristic
 
+    def predict_batch(self, states, keys=None):
+        """
+        Predizioni grezze per una matrice (N, 54) di stati compatti.
+        Gli stati già in cache non passano dal modello: si predicono solo i miss.
+        In modalità 'hybrid' gli stati entro il raggio dell'indice esatto usano la distanza vera.
+        keys: chiavi cubie_keys degli stati, se già calcolate (la beam le ha dalla tabella di trasposizione).
+        """
+        if self.exact_index is not None:
+            exact, _ = self.exact_index.lookup(states)
+            covered = exact >= 0
+            if covered.any():
+                # Stati coperti: distanza esatta, nessuna chiamata al modello
+                heuristics = exact.astype(np.float64)
+                if not covered.all():
+                    far_idx = np.flatnonzero(~covered)
+                    heuristics[far_idx] = self._predict_cached(states[far_idx],
+                                                               None if keys is None else keys[far_idx])
+                return heuristics
+
+        return self._predict_cached(states, keys)
+
+    def _predict_cached(self, states, keys=None):
+        """Predizioni passando da cache LRU, cache su disco e modello, in quest'ordine."""
+        # Chiave a 64 bit dalle coordinate dei cubetti, la stessa per entrambe le cache
+        if keys is None:
+            keys = cubie_keys(states)
+        key_list = keys.tolist()
+        heuristics, miss_mask = self.prediction_cache.get_many(key_list)
+
+        if miss_mask.any() and self.disk_cache is not None:
+            miss_idx = np.flatnonzero(miss_mask)
+            disk_values, disk_miss = self.disk_cache.get_many(keys[miss_idx])
+            found = miss_idx[~disk_miss]
+            heuristics[found] = disk_values[~disk_miss]
+            self.prediction_cache.put_many([key_list[i] for i in found], disk_values[~disk_miss])
+            miss_mask[found] = False
+
+        if miss_mask.any():
+            miss_idx = np.flatnonzero(miss_mask)
+            predictions = self.predict_states(states[miss_idx])
+            heuristics[miss_idx] = predictions
+            self.prediction_cache.put_many([key_list[i] for i in miss_idx], predictions)
+            if self.disk_cache is not None:
+                self.disk_cache.put_many(keys[miss_idx], predictions)
+
+        return heuristics
+
+    def predict_states(self, states):
+        """Chiamata al modello su stati compatti, divisa tra i worker se il batch è abbastanza grande."""
+        if self.evaluator is not None and len(states) >= self.evaluator.min_parallel_batch:
+            try:
+                return self.evaluator.predict(states)
+            except RuntimeError as e:
+                # Worker morti o in errore: si prosegue con il modello di questo processo
+                print(f"[-] Valutazione parallela disattivata: {e}")
+                self.evaluator.close()
+                self.evaluator = None
+        return self.model.predict(self.featurize(CubeBatch(states)))
+
+    def save_disk_cache(self):
+        """Fonde nel file su disco le predizioni nuove di questo processo (unico scrittore)."""
+        if self.disk_cache is None:
+            return 0
+        return self.disk_cache.merge()
+
+    def featurize(self, batch):
+        """Feature di un CubeBatch per la pipeline selezionata, calcolate in un'unica passata NumPy."""
+        if self.pipeline == 'OHE':
+            return batch.get_state()
+        return batch.get_manhattan_features()
+
     def get_heuristic(self, cube):
         return self.get_heuristic_cached(cube)
 
     def solve_beam_ultra(self, start_cube, beam_width, max_depth,
-                         restart_prob=0.15, timeout_seconds=None, epsilon=1.0):
-        """Beam Search con Epsilon Adattiva."""
+                         restart_prob=0.15, timeout_seconds=None, epsilon=1.0, cancel_event=None):
+        """
+        Beam Search con Epsilon Adattiva. cancel_event (es. multiprocessing.Event) la interrompe.
+        La frontiera è una struttura di array (vedi _Beam): il percorso viene ricostruito
+        all'indietro solo quando si trova la soluzione.
+        """
         start_time = time.time()
+        # La ricerca lavora sempre sul backend compatto (mosse come gather precalcolati)
+        start_cube = FastRubiksCube.from_cube(start_cube)
         if start_cube.is_solved(): return [], 0
 
-        h_start = self.get_heuristic_cached(start_cube)
-        candidates = [(h_start * epsilon, h_start, start_cube, [])]
-        total_nodes = 0
-        prev_best_h = float('inf')
-        stagnation_counter = 0
-
-        for depth in range(max_depth):
+        if self.endgame_table is not None:
+            path = self.endgame_table.complete(start_cube)
+            if path is not None: return path, 0
+
+        beam = _Beam(start_cube.state, beam_width, restart_prob, epsilon)
+        for _ in self._beam_steps(beam, max_depth, timeout_seconds, cancel_event, start_time):
+            pass
+        return beam.path, beam.total_nodes
+
+    def _beam_steps(self, beam, max_depth, timeout_seconds=None, cancel_event=None, start_time=None):
+        """
+        Ciclo per profondità della beam search, condiviso da solve_beam_ultra e solve_stream:
+        produce la beam dopo ogni profondità completata. Alla fine beam.path è la soluzione,
+        oppure None (beam esaurita, max_depth o timeout raggiunti, o cancel_event: beam.cancelled).
+        """
+        start_time = start_time or time.time()
+        self.duplicates_per_level = beam.duplicates_per_level
+
+        for _ in range(max_depth):
             if timeout_seconds and (time.time() - start_time) > timeout_seconds:
-                return None, total_nodes
-
-            all_child_data = []
-            for _, _, parent_cube, parent_moves in candidates:
-                for move_name in self.moves:
-                    for is_rev in [False, True]:
-                        if parent_moves and parent_moves[-1] == (move_name, not is_rev):
-                            continue
-
-                        child = copy.deepcopy(parent_cube)
-                        child.rotate_face(move_name, reverse=is_rev)
-                        new_moves = parent_moves + [(move_name, is_rev)]
-                        total_nodes += 1
-
-                        if child.is_solved():
-                            print(f"   >> Risolto d={depth + 1} | Nodi={total_nodes}")
-                            return new_moves, total_nodes
+                return
+            if cancel_event is not None and cancel_event.is_set():
+                beam.cancelled = True
+                return
+
+            children = beam.expand(self.endgame_table)
+            if children is None: return
+            beam.select(self.predict_batch(children, beam.pending_keys))
+            yield beam
+
+    def solve_beam_many(self, cubes, beam_width, max_depth,
+                        restart_prob=0.15, timeout_seconds=None, epsilon=1.0, cancel_event=None):
+        """
+        Beam search di più cubi in parallelo (lockstep): a ogni profondità i figli di tutte le beam
+        attive vanno in un'unica chiamata a predict_batch e i punteggi vengono ridivisi per cubo.
+        Le beam escono dal lotto appena risolte, esaurite o scadute: ognuna ha la propria scadenza,
+        timeout_seconds dal momento in cui viene creata.
+        Restituisce una lista di (percorso o None, nodi) nello stesso ordine di cubes.
+        """
+        results = [(None, 0)] * len(cubes)
+        beams = {}
+        for i, cube in enumerate(cubes):
+            cube = FastRubiksCube.from_cube(cube)
+            if cube.is_solved():
+                results[i] = ([], 0)
+                continue
+            if self.endgame_table is not None:
+                path = self.endgame_table.complete(cube)
+                if path is not None:
+                    results[i] = (path, 0)
+                    continue
+            beams[i] = _Beam(cube.state, beam_width, restart_prob, epsilon, timeout_seconds)
+
+        for _ in range(max_depth):
+            if not beams:
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                break
+
+            level_children, level_keys, owners = [], [], []
+            for i, beam in list(beams.items()):
+                if beam.expired():
+                    results[i] = (None, beam.total_nodes)
+                    del beams[i]
+                    continue
+                children = beam.expand(self.endgame_table)
+                if children is None:
+                    results[i] = (beam.path, beam.total_nodes)
+                    del beams[i]
+                    continue
+                level_children.append(children)
+                level_keys.append(beam.pending_keys)
+                owners.append(i)
+            if not owners:
+                break
+
+            heuristics = self.predict_batch(np.concatenate(level_children), np.concatenate(level_keys))
+            splits = np.cumsum([len(children) for children in level_children])[:-1]
+            for i, beam_heuristics in zip(owners, np.split(heuristics, splits)):
+                beams[i].select(beam_heuristics)
+
+        for i, beam in beams.items():
+            results[i] = (None, beam.total_nodes)
+        return results
+
+    def solve_pdb(self, cube, weight, timeout_seconds=None, cancel_event=None):
+        """Livello alternativo alla beam: IDA*/A* pesato sui pattern database, modello come tie-breaker."""
+        tie_breaker = self.predict_batch if self.pdb_tie_breaker else None
+        path, n = self.pdb_solver.solve(cube, weight=weight, timeout_seconds=timeout_seconds,
+                                        tie_breaker=tie_breaker, cancel_event=cancel_event)
+        if path is not None:
+            print(f"   >> Risolto d={len(path)} (pattern database, w={weight}) | Nodi={n}")
+        return path, n
+
+    def _run_level(self, cubes, level, cancel_event=None):
+        """
+        Esegue un livello di ricerca (BeamLevel o PDBLevel) su una lista di cubi.
+        Unico punto che distingue i tipi di livello. Restituisce una lista di (percorso o None, nodi).
+        Con più cubi la beam avanza in lockstep e ogni cubo ha la propria scadenza di timeout_seconds
+        (vedi solve_beam_many); il PDB, un cubo alla volta, ha invece un'unica scadenza per tutto
+        il lotto, divisa tra i cubi ancora da provare.
+        """
+        if level.kind == 'pdb':
+            deadline = time.time() + level.timeout_seconds
+            results = []
+            for k, cube in enumerate(cubes):
+                remaining = deadline - time.time()
+                if remaining <= 0 or (cancel_event is not None and cancel_event.is_set()):
+                    results.append((None, 0))
+                    continue
+                results.append(self.solve_pdb(cube, level.weight, remaining / (len(cubes) - k),
+                                              cancel_event=cancel_event))
+            return results
+        if level.kind != 'beam':
+            raise ValueError(f"Tipo di livello sconosciuto: {level.kind}")
+        if len(cubes) == 1:
+            return [self.solve_beam_ultra(cubes[0], level.beam_width, level.max_depth, level.restart_prob,
+                                          timeout_seconds=level.timeout_seconds, epsilon=level.epsilon,
+                                          cancel_event=cancel_event)]
+        return self.solve_beam_many(cubes, level.beam_width, level.max_depth, level.restart_prob,
+                                    timeout_seconds=level.timeout_seconds, epsilon=level.epsilon,
+                                    cancel_event=cancel_event)
+
+    def search_levels(self):
+        """Sequenza dei livelli: la beam di SEARCH_LEVELS, con PDB_LEVEL dopo il primo se disponibile."""
+        if self.pdb_solver is None:
+            return list(SEARCH_LEVELS)
+        return SEARCH_LEVELS[:1] + [PDB_LEVEL] + SEARCH_LEVELS[1:]
+
+    def check_mate(self, cube):
+        """Cerca una soluzione in una mossa. Una sola copia: ogni mossa viene applicata e annullata in place."""
+        probe = cube.clone()
+        for move_id, move in enumerate(MOVES):
+            probe.apply_move(move_id)
+            if probe.is_solved():
+                return [move]
+            probe.undo_move(move_id)
+        return None
+
+    def solve_adaptive_ultra(self, cube, portfolio=False):
+        if portfolio:
+            return self.solve_portfolio(cube)
+
+        if not self.persistent_cache:
+            self.prediction_cache.clear()
+        total_nodes = 0
+        cube = FastRubiksCube.from_cube(cube)
 
-                        all_child_data.append((child, new_moves))
+        if cube.is_solved(): return [], 0
 
-            if not all_child_data: return None, total_nodes
+        # --- 1. CHECK-MATE PREVENTIVO ---
+        path = self.check_mate(cube)
+        if path: return path, 1
 
-            if self.pipeline == 'OHE':
-                X_batch = np.array([c[0].get_state() for c in all_child_data])
-            else:
-                X_batch = np.array([c[0].get_manhattan_features() for c in all_child_data])
+        # --- 2. LIVELLI DI RICERCA (vedi SEARCH_LEVELS e PDB_LEVEL), in sequenza ---
+        for level in self.search_levels():
+            path, n = self._run_level([cube], level)[0]
+            total_nodes += n
+            if path: return path, total_nodes
 
-            heuristics = self.model.predict(X_batch)
+        return None, total_nodes
 
-            combined = []
-            for i, h in enumerate(heuristics):
-                f_score = (depth + 1) + (h * epsilon)
-                combined.append((f_score, h, all_child_data[i][0], all_child_data[i][1]))
+    def solve_stream(self, cube, cancel_event=None):
+        """
+        Variante a generatore di solve_adaptive_ultra: dopo ogni profondità produce un record
+        di avanzamento (dict) con level, depth, best_h, beam_size, nodes, elapsed, cache_hit_rate
+        e best_path, il percorso verso lo stato con h minima visto finora.
+        L'ultimo record ha done=True e path (None se non risolto). Se cancel_event (qualsiasi oggetto
+        con is_set()) viene impostato la ricerca si ferma con cancelled=True; il chiamante può anche
+        semplicemente smettere di iterare e usare best_path dell'ultimo record ricevuto.
+        """
+        start_time = time.time()
+        if not self.persistent_cache:
+            self.prediction_cache.clear()
+        # I contatori della cache sono cumulativi: il tasso si calcola rispetto all'inizio di questa risoluzione
+        cache_start = (self.prediction_cache.hits, self.prediction_cache.misses)
+        cube = FastRubiksCube.from_cube(cube)
+        total_nodes = 0
+        best_h, best_path = float('inf'), []
 
-            combined.sort(key=lambda x: x[0])
+        def progress(level, depth, beam_size, done=False, path=None, cancelled=False):
+            hits = self.prediction_cache.hits - cache_start[0]
+            lookups = hits + self.prediction_cache.misses - cache_start[1]
+            return {'level': level, 'depth': depth, 'best_h': best_h, 'beam_size': beam_size,
+                    'nodes': total_nodes, 'elapsed': time.time() - start_time,
+                    'cache_hit_rate': hits / lookups if lookups else 0.0,
+                    'best_path': list(best_path), 'done': done, 'path': path, 'cancelled': cancelled}
 
-            current_best_h = combined[0][1]
-            if current_best_h >= prev_best_h:
-                stagnation_counter += 1
-            else:
-                stagnation_counter = 0
-            prev_best_h = current_best_h
-
-            if np.random.random() < restart_prob or stagnation_counter >= 3:
-                elite = combined[:min(10, beam_width // 4)]
-                candidates = elite + random.sample(combined[len(elite):],
-                                                   min(len(combined) - len(elite), beam_width - len(elite)))
-                stagnation_counter = 0
-            else:
-                candidates = combined[:beam_width]
+        if cube.is_solved():
+            yield progress(0, 0, 0, done=True, path=[])
+            return
+        path = self.check_mate(cube)
+        if path:
+            total_nodes = 1
+            yield progress(0, 1, 0, done=True, path=path)
+            return
+        if self.endgame_table is not None:
+            path = self.endgame_table.complete(cube)
+            if path is not None:
+                yield progress(0, 0, 0, done=True, path=path)
+                return
+
+        for level_number, level in enumerate(self.search_levels(), start=1):
+            if cancel_event is not None and cancel_event.is_set():
+                yield progress(level_number, 0, 0, done=True, cancelled=True)
+                return
+
+            if level.kind != 'beam':
+                # Livelli senza profondità intermedie: un solo record a fine livello
+                path, n = self._run_level([cube], level, cancel_event=cancel_event)[0]
+                total_nodes += n
+                if path is not None:
+                    yield progress(level_number, len(path), 0, done=True, path=path)
+                    return
+                yield progress(level_number, 0, 0)
+                continue
+
+            level_nodes = total_nodes
+            beam = _Beam(cube.state, level.beam_width, level.restart_prob, level.epsilon)
+            for _ in self._beam_steps(beam, level.max_depth, level.timeout_seconds, cancel_event):
+                total_nodes = level_nodes + beam.total_nodes
+                if beam.best_h < best_h:
+                    best_h, best_path = beam.best_h, beam.build_path([], beam.best_node)
+                yield progress(level_number, beam.depth, len(beam.states))
+
+            total_nodes = level_nodes + beam.total_nodes
+            if beam.path is not None:
+                yield progress(level_number, beam.depth + 1, len(beam.states), done=True, path=beam.path)
+                return
+            if beam.cancelled:
+                yield progress(level_number, beam.depth, len(beam.states), done=True, cancelled=True)
+                return
+
+        yield progress(len(self.search_levels()), 0, 0, done=True)
+
+    def solve_many(self, cubes):
+        """
+        Risolve un lotto di cubi con gli stessi livelli di solve_adaptive_ultra, ma avanzando
+        le beam di tutti i cubi non ancora risolti in lockstep (vedi solve_beam_many): una sola
+        chiamata al modello per profondità per l'intero lotto.
+        Restituisce una lista di (percorso o None, nodi) nello stesso ordine di cubes.
+        """
+        if not self.persistent_cache:
+            self.prediction_cache.clear()
+        cubes = [FastRubiksCube.from_cube(cube) for cube in cubes]
+        paths = [None] * len(cubes)
+        nodes = [0] * len(cubes)
+
+        pending = []
+        for i, cube in enumerate(cubes):
+            if cube.is_solved():
+                paths[i] = []
+                continue
+            path = self.check_mate(cube)
+            if path:
+                paths[i], nodes[i] = path, 1
+                continue
+            pending.append(i)
+
+        for level in self.search_levels():
+            if not pending:
+                break
+            results = self._run_level([cubes[i] for i in pending], level)
+            for i, (path, n) in zip(pending, results):
+                nodes[i] += n
+                paths[i] = path
+            pending = [i for i in pending if paths[i] is None]
+
+        return list(zip(paths, nodes))
+
+    def solve_portfolio(self, cube, max_workers=None, grace_seconds=0.5, seed=None):
+        """
+        Modalità portfolio: tutti i livelli (vedi search_levels) partono insieme in un pool di processi,
+        con seed diversi. Restituisce la soluzione più corta trovata entro grace_seconds dalla prima
+        e cancella i worker rimasti. Il pool resta attivo tra una risoluzione e l'altra (vedi close).
+        """
+        cube = FastRubiksCube.from_cube(cube)
+        if cube.is_solved(): return [], 0
 
-        return None, total_nodes
+        path = self.check_mate(cube)
+        if path: return path, 1
 
-    def solve_adaptive_ultra(self, cube):
-        self.prediction_cache = {}
-        n1 = n2 = n3 = 0
+        if self._portfolio is None:
+            max_workers = max_workers or min(len(self.search_levels()), mp.cpu_count())
+            manager = mp.Manager()
+            cancel_event = manager.Event()
+            pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_portfolio_init,
+                                       initargs=(self.solver_kwargs, cancel_event))
+            self._portfolio = (pool, manager, cancel_event)
+        pool, _, cancel_event = self._portfolio
+        cancel_event.clear()
 
-        if cube.is_solved(): return [], 0
+        base_seed = random.randrange(2 ** 31) if seed is None else seed
+        pending = {pool.submit(_portfolio_run, cube.state, level, base_seed + i)
+                   for i, level in enumerate(self.search_levels())}
 
-        # --- 1. CHECK-MATE PREVENTIVO ---
-        for move_name in self.moves:
-            for is_rev in [False, True]:
-                test_cube = copy.deepcopy(cube)
-                test_cube.rotate_face(move_name, reverse=is_rev)
-                if test_cube.is_solved():
-                    return [(move_name, is_rev)], 1
-
-        # --- 2. LIVELLO 1: Rapido (Cerca la via più breve) ---
-        # Timeout aggressivo
-        path, n1 = self.solve_beam_ultra(copy.deepcopy(cube), 250, 25, 0.1, timeout_seconds=10, epsilon=1.0)
-        if path: return path, n1
-
-        # --- 3. LIVELLO 2: Espansivo (Bilanciato) ---
-        # Aumentiamo epsilon a 1.4: diamo più peso all'IA per superare l'incertezza.
-        path, n2 = self.solve_beam_ultra(copy.deepcopy(cube), 1200, 55, 0.3, timeout_seconds=45, epsilon=1.2)
-        if path: return path, n1 + n2
-
-        # --- 4. LIVELLO 3: Esplorazione profonda ---
-        for attempt in range(2):
-            path, n = self.solve_beam_ultra(copy.deepcopy(cube), 800, 80, 0.7, timeout_seconds=120, epsilon=1.5)
-            n3 += n
-            if path: return path, n1 + n2 + n3
-
-        return None, n1 + n2 + n3
\ No newline at end of file
+        best_path = None
+        total_nodes = 0
+        first_solution_time = None
+        while pending:
+            timeout = None if first_solution_time is None else \
+                max(0.0, first_solution_time + grace_seconds - time.time())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                path, n = future.result()
+                total_nodes += n
+                if path is not None and (best_path is None or len(path) < len(best_path)):
+                    best_path = path
+                    if first_solution_time is None:
+                        first_solution_time = time.time()
+
+        # Cancella i perdenti: si fermano al livello successivo della beam
+        cancel_event.set()
+        for future in pending:
+            path, n = future.result()
+            total_nodes += n
+            if path is not None and (best_path is None or len(path) < len(best_path)):
+                best_path = path
+
+        return best_path, total_nodes
+
+    def close(self):
+        """
+        Chiude i pool di processi (portfolio e valutatore parallelo), se attivi,
+        e fonde nella cache su disco le predizioni nuove di questo processo.
+        """
+        if self._portfolio is not None:
+            pool, manager, _ = self._portfolio
+            pool.shutdown(wait=True)
+            manager.shutdown()
+            self._portfolio = None
+        if self.evaluator is not None:
+            self.evaluator.close()
+            self.evaluator = None
+        self.save_disk_cache()
@@ -0,0 +1,103 @@
+import os
+import json
+import socket
+import itertools
+from FastRubiksCube import FastRubiksCube
+
+# Stesso indirizzo di default di SolverService (qui per non importare il solver nel client)
+DEFAULT_ADDRESS = ('127.0.0.1', 8765) if os.name == 'nt' else '/tmp/magicsolver.sock'
+
+
+class SolverClient:
+    """
+    Client sottile per SolverService. Espone gli stessi metodi di RubiksSolver usati da GUI e
+    benchmark (solve_adaptive_ultra, solve_many, get_heuristic), quindi può sostituirlo senza
+    caricare il modello nel processo.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=None):
+        self.address = address
+        if isinstance(address, str):
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(timeout)
+            self.sock.connect(address)
+        else:
+            self.sock = socket.create_connection(address, timeout=timeout)
+        self.stream = self.sock.makefile('rwb')
+        self.ids = itertools.count()
+        # Tempo lato servizio del lotto dell'ultima risoluzione (non della singola richiesta) e sua dimensione
+        self.last_batch_time = None
+        self.last_batch_size = None
+
+    def _request_many(self, requests):
+        """Invia tutte le richieste di seguito (il servizio le può unire in un lotto) e attende le risposte."""
+        ids = []
+        for request in requests:
+            request = dict(request, id=next(self.ids))
+            ids.append(request['id'])
+            self.stream.write(json.dumps(request).encode() + b'\n')
+        self.stream.flush()
+
+        responses = {}
+        while len(responses) < len(ids):
+            line = self.stream.readline()
+            if not line:
+                raise ConnectionError("Connessione al servizio chiusa")
+            response = json.loads(line)
+            responses[response['id']] = response
+
+        ordered = [responses[i] for i in ids]
+        for response in ordered:
+            if 'error' in response:
+                raise RuntimeError(f"Errore del servizio: {response['error']}")
+        return ordered
+
+    @staticmethod
+    def _state(cube):
+        return FastRubiksCube.from_cube(cube).state.tolist()
+
+    @staticmethod
+    def _path(path):
+        return None if path is None else [tuple(move) for move in path]
+
+    def ping(self):
+        return self._request_many([{'op': 'ping'}])[0]
+
+    def stats(self):
+        return self._request_many([{'op': 'stats'}])[0]
+
+    def solve_adaptive_ultra(self, cube):
+        return self.solve_many([cube])[0]
+
+    def solve_many(self, cubes):
+        responses = self._request_many([{'op': 'solve', 'state': self._state(cube)} for cube in cubes])
+        if responses:
+            self.last_batch_time = responses[-1]['batch_time']
+            self.last_batch_size = responses[-1]['batch_size']
+        return [(self._path(r['path']), r['nodes']) for r in responses]
+
+    def get_heuristic(self, cube):
+        return self._request_many([{'op': 'heuristic', 'state': self._state(cube)}])[0]['heuristic']
+
+    def close(self):
+        self.stream.close()
+        self.sock.close()
+
+
+def get_solver(pipeline='OHE', address=DEFAULT_ADDRESS):
+    """
+    Client del servizio se ne è attivo uno con la stessa pipeline, altrimenti un RubiksSolver locale.
+    Per misure di tempo (benchmark) serve un RubiksSolver locale: con il servizio i tempi
+    includerebbero l'attesa del lotto e le richieste di altri processi.
+    """
+    try:
+        client = SolverClient(address, timeout=None)
+        if client.ping().get('pipeline') == pipeline:
+            print(f"[*] Connesso al servizio di risoluzione su {address}")
+            return client
+        client.close()
+    except OSError:
+        pass
+
+    from Solver import RubiksSolver
+    return RubiksSolver(pipeline=pipeline)
@@ -0,0 +1,198 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import socket
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from FastRubiksCube import FastRubiksCube
+from Solver import RubiksSolver
+from CubieCube import validate_state
+
+# Su Windows niente socket Unix: si usa TCP su localhost
+DEFAULT_ADDRESS = ('127.0.0.1', 8765) if os.name == 'nt' else '/tmp/magicsolver.sock'
+
+
+class SolverService:
+    """
+    Servizio locale di risoluzione: carica il modello una sola volta e riceve stati in JSON
+    (una richiesta per riga) su socket Unix o TCP localhost.
+    Le richieste che arrivano entro batch_window secondi vengono unite in un unico lotto:
+    le risoluzioni passano da solve_many (una chiamata al modello per profondità per tutto il lotto),
+    le stime euristiche da un solo predict_batch.
+
+    Richiesta:  {"id": 1, "op": "solve" | "heuristic" | "ping" | "stats", "state": [54 codici colore 0-5]}
+    Risposta:   {"id": 1, "path": [["top", false], ...] | null, "nodes": n, "batch_time": s, "batch_size": k}
+    batch_time è il tempo dell'intero lotto di batch_size risoluzioni, non quello della singola richiesta.
+    """
+
+    def __init__(self, pipeline='OHE', batch_window=0.05, max_batch=64, **solver_kwargs):
+        # Il servizio vive a lungo: la cache delle predizioni resta valida tra le richieste
+        solver_kwargs.setdefault('persistent_cache', True)
+        self.solver = RubiksSolver(pipeline=pipeline, **solver_kwargs)
+        self.pipeline = pipeline
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        # Un solo thread per il solver: il ciclo asyncio resta libero di accettare richieste
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+        self.requests_served = 0
+        self.batches_served = 0
+
+    async def serve(self, address=DEFAULT_ADDRESS):
+        if isinstance(address, str) and os.path.exists(address):
+            # Un socket rimasto da un servizio terminato male si può rimuovere, uno attivo no
+            if socket_in_use(address):
+                raise RuntimeError(f"Un altro servizio è già in ascolto su {address}")
+            os.remove(address)
+
+        self.queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._batcher())
+        if isinstance(address, str):
+            server = await asyncio.start_unix_server(self._handle, path=address)
+        else:
+            host, port = address
+            server = await asyncio.start_server(self._handle, host=host, port=port)
+
+        print(f"[+] Servizio in ascolto su {address} (pipeline {self.pipeline})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self.executor.shutdown(wait=True)
+            self.solver.close()
+            if isinstance(address, str) and os.path.exists(address):
+                os.remove(address)
+
+    async def _handle(self, reader, writer):
+        """Una connessione può inviare più richieste senza attendere: le risposte portano l'id."""
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer):
+        request = {}
+        try:
+            request = json.loads(line)
+            op = request.get('op', 'solve')
+            if op == 'ping':
+                response = {'ok': True, 'pipeline': self.pipeline}
+            elif op == 'stats':
+                response = {'requests': self.requests_served, 'batches': self.batches_served,
+                            'cache': self.solver.prediction_cache.stats()}
+            elif op in ('solve', 'heuristic'):
+                state = np.array(request['state'], dtype=np.int64)
+                if state.shape != (54,) or state.min() < 0 or state.max() > 5:
+                    raise ValueError("'state' deve contenere 54 codici colore tra 0 e 5")
+                # Stati impossibili rifiutati qui: nel lotto farebbero fallire anche le altre richieste
+                validate_state(state.astype(np.uint8))
+                future = asyncio.get_running_loop().create_future()
+                await self.queue.put((op, state.astype(np.uint8), future))
+                response = await future
+            else:
+                raise ValueError(f"operazione sconosciuta: {op}")
+        except Exception as e:
+            response = {'error': repr(e)}
+
+        response['id'] = request.get('id') if isinstance(request, dict) else None
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+
+    async def _batcher(self):
+        """Raccoglie le richieste per al più batch_window secondi (o max_batch) e le esegue insieme."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                responses = await loop.run_in_executor(self.executor, self._run_batch, batch)
+            except Exception as e:
+                responses = [{'error': repr(e)}] * len(batch)
+            for (_, _, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+            self.requests_served += len(batch)
+            self.batches_served += 1
+
+    def _run_batch(self, batch):
+        """Eseguito nel thread del solver: risoluzioni con solve_many, stime con un solo predict_batch."""
+        responses = [None] * len(batch)
+
+        heuristic_idx = [i for i, (op, _, _) in enumerate(batch) if op == 'heuristic']
+        if heuristic_idx:
+            states = np.array([batch[i][1] for i in heuristic_idx])
+            predictions = self.solver.predict_batch(states)
+            for i, state, prediction in zip(heuristic_idx, states, predictions):
+                solved = FastRubiksCube(state).is_solved()
+                responses[i] = {'heuristic': 0 if solved else max(1, int(np.round(prediction)))}
+
+        solve_idx = [i for i, (op, _, _) in enumerate(batch) if op == 'solve']
+        if solve_idx:
+            start_t = time.time()
+            results = self.solver.solve_many([FastRubiksCube(batch[i][1]) for i in solve_idx])
+            elapsed = time.time() - start_t
+            for i, (path, nodes) in zip(solve_idx, results):
+                responses[i] = {'path': path, 'nodes': nodes, 'batch_time': elapsed, 'batch_size': len(solve_idx)}
+
+        return responses
+
+
+def socket_in_use(path, timeout=1.0):
+    """True se qualcuno accetta connessioni sul socket Unix path."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    probe.settimeout(timeout)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+def parse_address(socket_path=None, port=None):
+    if port is not None:
+        return ('127.0.0.1', port)
+    return socket_path or DEFAULT_ADDRESS
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servizio locale MagicSolver")
+    parser.add_argument('--pipeline', default='OHE', choices=['OHE', 'Manhattan'])
+    parser.add_argument('--socket', default=None, help="percorso del socket Unix")
+    parser.add_argument('--port', type=int, default=None, help="porta TCP su localhost (al posto del socket)")
+    parser.add_argument('--batch-window', type=float, default=0.05)
+    parser.add_argument('--max-batch', type=int, default=64)
+    args = parser.parse_args()
+
+    service = SolverService(args.pipeline, batch_window=args.batch_window, max_batch=args.max_batch)
+    try:
+        asyncio.run(service.serve(parse_address(args.socket, args.port)))
+    except KeyboardInterrupt:
+        print("\n[*] Servizio arrestato.")
+        sys.exit(0)
+    except (RuntimeError, OSError) as e:
+        print(f"[-] Avvio del servizio non riuscito: {e}")
+        sys.exit(1)
@@ -0,0 +1,78 @@
+import time
+import csv
+import random
+from RubiksCube import RubiksCube
+from Solver import RubiksSolver, SEARCH_LEVELS, PDB_LEVEL
+
+# Stessi intervalli di scramble di benchmark_easy / benchmark_medium / benchmark_hard
+RANGES = {'EASY': (1, 10), 'MEDIUM': (11, 15), 'HARD': (17, 20)}
+
+
+def solve_with_beam(solver, cube):
+    """Solo i livelli della beam search, in sequenza (come solve_adaptive_ultra senza pattern database)."""
+    total_nodes = 0
+    for level in SEARCH_LEVELS:
+        path, n = solver.solve_beam_ultra(cube, level.beam_width, level.max_depth, level.restart_prob,
+                                          timeout_seconds=level.timeout_seconds, epsilon=level.epsilon)
+        total_nodes += n
+        if path is not None:
+            return path, total_nodes
+    return None, total_nodes
+
+
+def run_pdb_benchmark(num_tests=10, pdb_dir='pdb', filename='benchmark_beam_vs_pdb.csv'):
+    solver = RubiksSolver(pipeline='OHE', pdb_dir=pdb_dir)
+    engines = {
+        'BEAM': lambda cube: solve_with_beam(solver, cube),
+        f'PDB_W{PDB_LEVEL.weight}': lambda cube: solver.solve_pdb(cube, PDB_LEVEL.weight, PDB_LEVEL.timeout_seconds),
+    }
+
+    print(f"\n{'=' * 60}")
+    print(f"[*] AVVIO BENCHMARK BEAM vs PATTERN DATABASE")
+    print(f"[*] Test per intervallo: {num_tests} | Motori: {', '.join(engines)}")
+    print(f"{'=' * 60}\n")
+
+    summary = {}
+    with open(filename, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow([
+            'Intervallo', 'Test_ID', 'Mosse_Scramble', 'Motore', 'Risolto',
+            'Tempo_Secondi', 'Nodi_Esplorati', 'Lunghezza_Soluzione'
+        ])
+
+        for range_name, (low, high) in RANGES.items():
+            for i in range(1, num_tests + 1):
+                # Stesso scramble per entrambi i motori
+                cube = RubiksCube()
+                depth = random.randint(low, high)
+                cube.scramble(depth)
+                print(f"[{range_name} {i}/{num_tests}] Scramble: {depth}")
+
+                for engine, solve in engines.items():
+                    start_t = time.time()
+                    solution, nodes = solve(cube.clone())
+                    tempo = time.time() - start_t
+
+                    solved = solution is not None
+                    lunghezza = len(solution) if solved else 0
+                    writer.writerow([range_name, i, depth, engine, int(solved), f"{tempo:.4f}", nodes, lunghezza])
+
+                    stats = summary.setdefault((range_name, engine), [0, 0.0, 0])
+                    stats[0] += int(solved)
+                    stats[1] += tempo
+                    stats[2] += lunghezza
+
+                    status = "✅" if solved else "❌"
+                    print(f"    --> {engine:<8} {status} | Tempo: {tempo:.2f}s | Nodi: {nodes} | Mosse: {lunghezza}")
+
+    print("\n" + "=" * 60)
+    print(f" {'Intervallo':<10} {'Motore':<8} {'Successo':>9} {'Tempo medio':>12} {'Mosse medie':>12}")
+    for (range_name, engine), (solved, tempo, lunghezza) in summary.items():
+        print(f" {range_name:<10} {engine:<8} {100 * solved / num_tests:>8.1f}% {tempo / num_tests:>11.2f}s "
+              f"{lunghezza / max(solved, 1):>12.1f}")
+    print(f" I risultati dettagliati sono in: {filename}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    run_pdb_benchmark(num_tests=10)
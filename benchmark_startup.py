@@ -0,0 +1,62 @@
+import sys
+import json
+import subprocess
+
+# Cosa importa ciascun processo: il solver (GUI/servizio/benchmark) e i worker dei generatori di dataset,
+# che con lo start method 'spawn' (Windows, macOS) reimportano il modulo principale.
+TARGETS = {
+    'RubiksCube': 'import RubiksCube',
+    'FastRubiksCube': 'import FastRubiksCube',
+    'Solver': 'import Solver',
+    'DataSetGenerator (worker)': 'import DataSetGenerator',
+    'DataSetGeneratorManhattanDistance (worker)': 'import DataSetGeneratorManhattanDistance',
+    'RubiksCube + rendering 3D': 'import matplotlib; matplotlib.use("Agg"); import RubiksCube; '
+                                 'RubiksCube.RubiksCube().visualize_opposite_corners(return_fig=True)',
+}
+
+# Eseguito in un interprete nuovo: tempo dell'import e RSS di picco, in MB
+PROBE = """
+import sys, time, json
+start_t = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start_t
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+except ImportError:
+    rss = float('nan')
+print(json.dumps({{'time': elapsed, 'rss': rss, 'matplotlib': 'matplotlib' in sys.modules}}))
+"""
+
+
+def measure(code, repeats=3):
+    """Miglior tempo su repeats interpreti nuovi (la cache dei .pyc è già calda dopo il primo)."""
+    best = None
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-c', PROBE.format(code=code)], capture_output=True, text=True)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        if best is None or sample['time'] < best['time']:
+            best = sample
+    return best, None
+
+
+def run_startup_benchmark(repeats=3):
+    print(f"\n{'=' * 60}")
+    print(f"[*] AVVIO BENCHMARK TEMPO DI AVVIO (migliore di {repeats} interpreti nuovi)")
+    print(f"{'=' * 60}\n")
+    print(f"{'Processo':<45} | {'Import (s)':>10} | {'RSS (MB)':>9} | matplotlib")
+    print("-" * 84)
+
+    for name, code in TARGETS.items():
+        sample, error = measure(code, repeats)
+        if sample is None:
+            print(f"{name:<45} | [-] {error}")
+            continue
+        print(f"{name:<45} | {sample['time']:>10.3f} | {sample['rss']:>9.1f} | "
+              f"{'sì' if sample['matplotlib'] else 'no'}")
+
+
+if __name__ == "__main__":
+    run_startup_benchmark()